@@ -104,6 +104,7 @@ def analyze_durations():
     
     # 音声長を取得
     durations = []
+    paths = []
     lang_durations = defaultdict(list)
     failed_files = []
     
@@ -119,6 +120,7 @@ def analyze_durations():
         
         if duration is not None:
             durations.append(duration)
+            paths.append(wav_file)
             # 言語別に分類
             lang_code = wav_file.stem.split('_')[0]
             lang_durations[lang_code].append(duration)
@@ -162,21 +164,9 @@ def analyze_durations():
     print(f"  最大値: {range_80_max:.3f}秒")
     print(f"  範囲: {range_80_max - range_80_min:.3f}秒")
     
-    # 最小・最大のファイルを特定
-    min_file = None
-    max_file = None
-    
-    print(f"\n極値ファイルを特定中...")
-    for wav_file in filtered_wav_files:
-        duration = get_audio_duration_manual(wav_file)
-        if duration is None:
-            duration = get_audio_duration_simple(wav_file)
-        
-        if duration is not None:
-            if abs(duration - min_duration) < 0.001:  # 浮動小数点の誤差を考慮
-                min_file = wav_file
-            if abs(duration - max_duration) < 0.001:
-                max_file = wav_file
+    # 最小・最大のファイルを特定（1回目の走査結果から取得）
+    min_file = paths[int(np.argmin(durations))]
+    max_file = paths[int(np.argmax(durations))]
     
     print(f"\n=== 極値ファイル ===")
     if min_file:
@@ -5,18 +5,27 @@ IEEE浮動小数点フォーマット対応
 """
 
 import os
+import argparse
 import numpy as np
 from pathlib import Path
 from collections import defaultdict
 import librosa
 
-# matplotlibのインポートを試行（利用できない場合はスキップ）
-try:
-    import matplotlib.pyplot as plt
-    MATPLOTLIB_AVAILABLE = True
-except ImportError:
-    MATPLOTLIB_AVAILABLE = False
-    print("matplotlibが利用できないため、分布図の作成をスキップします")
+# matplotlibは分布図を作成する場合のみ遅延インポート（--plot指定時）
+plt = None
+
+def load_matplotlib():
+    """matplotlibをGUIなしのAggバックエンドでインポート（利用できない場合はNone）"""
+    global plt
+    if plt is None:
+        try:
+            import matplotlib
+            matplotlib.use('Agg')
+            import matplotlib.pyplot as pyplot
+        except ImportError:
+            return None
+        plt = pyplot
+    return plt
 
 def get_audio_duration(wav_file):
     """librosaを使用してWAVファイルの音声長を取得（秒）"""
@@ -29,8 +38,8 @@ def get_audio_duration(wav_file):
         print(f"エラー: {wav_file}の読み込みに失敗: {e}")
         return None
 
-def analyze_durations():
-    """音声長を分析"""
+def analyze_durations(plot=False):
+    """音声長を分析（plot=Trueの場合は分布図も作成）"""
     print("=== librosaを使用したWAVファイル音声長分析 ===\n")
     print("IEEE浮動小数点フォーマット対応\n")
     
@@ -46,6 +55,7 @@ def analyze_durations():
     
     # 音声長を取得
     durations = []
+    paths = []
     lang_durations = defaultdict(list)
     failed_files = []
     
@@ -56,6 +66,7 @@ def analyze_durations():
         duration = get_audio_duration(wav_file)
         if duration is not None:
             durations.append(duration)
+            paths.append(wav_file)
             # 言語別に分類
             lang_code = wav_file.stem.split('_')[0]
             lang_durations[lang_code].append(duration)
@@ -99,17 +110,9 @@ def analyze_durations():
     print(f"  最大値: {range_80_max:.3f}秒")
     print(f"  範囲: {range_80_max - range_80_min:.3f}秒")
     
-    # 最小・最大のファイルを特定
-    min_file = None
-    max_file = None
-    
-    for wav_file in wav_files:
-        duration = get_audio_duration(wav_file)
-        if duration is not None:
-            if abs(duration - min_duration) < 0.001:  # 浮動小数点の比較
-                min_file = wav_file
-            if abs(duration - max_duration) < 0.001:  # 浮動小数点の比較
-                max_file = wav_file
+    # 最小・最大のファイルを特定（1回目の走査結果から取得）
+    min_file = paths[int(np.argmin(durations))]
+    max_file = paths[int(np.argmax(durations))]
     
     print(f"\n=== 極値ファイル ===")
     if min_file:
@@ -134,10 +137,8 @@ def analyze_durations():
         print(f"  中央値: {np.median(lang_durs):.3f}秒")
     
     # 分布の可視化
-    if MATPLOTLIB_AVAILABLE:
+    if plot:
         create_duration_histogram(durations, lang_durations)
-    else:
-        print("\n分布図の作成をスキップしました（matplotlibが利用できません）")
     
     return {
         'durations': durations,
@@ -154,8 +155,8 @@ def analyze_durations():
 
 def create_duration_histogram(durations, lang_durations):
     """音声長の分布を可視化"""
-    if not MATPLOTLIB_AVAILABLE:
-        print("matplotlibが利用できないため、分布図の作成をスキップしました")
+    if load_matplotlib() is None:
+        print("\nmatplotlibが利用できないため、分布図の作成をスキップしました")
         return
         
     plt.figure(figsize=(15, 10))
@@ -231,6 +232,14 @@ def print_summary(stats):
         print(f"   最長: {stats['max_file'].name} ({stats['max_duration']:.3f}秒)")
 
 if __name__ == "__main__":
-    stats = analyze_durations()
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--plot', dest='plot', action='store_true',
+                        help='音声長の分布図を作成する')
+    parser.add_argument('--no-plot', dest='plot', action='store_false',
+                        help='分布図を作成しない（デフォルト）')
+    parser.set_defaults(plot=False)
+    args = parser.parse_args()
+    
+    stats = analyze_durations(plot=args.plot)
     if stats:
         print_summary(stats) 
\ No newline at end of file
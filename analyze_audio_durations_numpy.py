@@ -5,21 +5,223 @@ IEEE浮動小数点フォーマット対応
 """
 
 import os
+import argparse
+import csv
+import array
+import mmap
 import numpy as np
 import struct
+import shelve
+import threading
 from pathlib import Path
-from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from tqdm import tqdm
 
-# matplotlibのインポートを試行（利用できない場合はスキップ）
+# matplotlibは分布図を作成する場合のみ遅延インポート（--plot指定時）
+plt = None
+
+def load_matplotlib():
+    """matplotlibをGUIなしのAggバックエンドでインポート（利用できない場合はNone）"""
+    global plt
+    if plt is None:
+        try:
+            import matplotlib
+            matplotlib.use('Agg')
+            import matplotlib.pyplot as pyplot
+        except ImportError:
+            return None
+        plt = pyplot
+    return plt
+
+# numbaのインポートを試行（利用できない場合はmmapによる解析を使用）
 try:
-    import matplotlib.pyplot as plt
-    MATPLOTLIB_AVAILABLE = True
+    from numba import njit
+    NUMBA_AVAILABLE = True
 except ImportError:
-    MATPLOTLIB_AVAILABLE = False
-    print("matplotlibが利用できないため、分布図の作成をスキップします")
+    NUMBA_AVAILABLE = False
+
+# ヘッダー読み込みはI/O待ちが中心のため、CPU数より多めのスレッドで並列化
+MAX_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+
+# 音声長のキャッシュ（raw/audio_durations.csvはcreate_audio_duration_csv.pyの成果物のため別ファイルに保存）
+DURATION_CACHE_FILE = 'raw/.duration_cache_numpy.csv'
+
+# WAVヘッダー解析用のStructを事前コンパイル（ファイルごとの書式文字列解析を省く）
+_U32 = struct.Struct('<I')
+_CHUNK_HEADER = struct.Struct('<4sI')
+_FMT_FIELDS = struct.Struct('<HHIIHH')
+
+# mmapで先頭から探索する範囲（LIST/INFOなどのメタデータを含めても十分な大きさ）
+MMAP_SCAN_SIZE = 65536
+
+def read_wav_header_mmap(wav_file):
+    """mmapした先頭部分からfmt/dataチャンクを直接探してヘッダー情報を取得"""
+    with open(wav_file, 'rb') as f:
+        size = min(MMAP_SCAN_SIZE, os.fstat(f.fileno()).st_size)
+        if size < 12:
+            return None
+        with mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ) as mm:
+            if mm[:4] != b'RIFF' or mm[8:12] != b'WAVE':
+                return None
+            
+            fmt_pos = mm.find(b'fmt ', 12)
+            if fmt_pos < 0 or fmt_pos + 8 + _FMT_FIELDS.size > size:
+                return None
+            
+            # dataはfmtチャンクの後ろから探す（メタデータ中の文字列との誤検出を避ける）
+            fmt_size = _U32.unpack_from(mm, fmt_pos + 4)[0]
+            data_pos = mm.find(b'data', fmt_pos + 8 + fmt_size)
+            if data_pos < 0 or data_pos + 8 > size:
+                return None
+            
+            file_size = _U32.unpack_from(mm, 4)[0]
+            (audio_format, num_channels, sample_rate,
+             byte_rate, block_align, bits_per_sample) = _FMT_FIELDS.unpack_from(mm, fmt_pos + 8)
+            data_size = _U32.unpack_from(mm, data_pos + 4)[0]
+    
+    bytes_per_frame = sample_rate * num_channels * (bits_per_sample // 8)
+    if bytes_per_frame == 0:
+        return None
+    
+    return {
+        'audio_format': audio_format,
+        'num_channels': num_channels,
+        'sample_rate': sample_rate,
+        'byte_rate': byte_rate,
+        'block_align': block_align,
+        'bits_per_sample': bits_per_sample,
+        'file_size': file_size,
+        'duration': data_size / bytes_per_frame
+    }
+
+# numba版で先頭から読み込むバイト数
+JIT_HEADER_READ_SIZE = 4096
+
+def _u16(buf, i):
+    return buf[i] | (buf[i + 1] << 8)
+
+def _u32(buf, i):
+    return buf[i] | (buf[i + 1] << 8) | (buf[i + 2] << 16) | (buf[i + 3] << 24)
+
+def parse_wav_header_bytes(buf):
+    """バイト配列からfmt/dataチャンクを走査（見つからない項目は-1）
+    
+    戻り値: (audio_format, num_channels, sample_rate, byte_rate,
+             block_align, bits_per_sample, file_size, data_size)
+    """
+    n = buf.shape[0]
+    if n < 12:
+        return -1, -1, -1, -1, -1, -1, -1, -1
+    # b'RIFF' / b'WAVE'
+    if buf[0] != 82 or buf[1] != 73 or buf[2] != 70 or buf[3] != 70:
+        return -1, -1, -1, -1, -1, -1, -1, -1
+    if buf[8] != 87 or buf[9] != 65 or buf[10] != 86 or buf[11] != 69:
+        return -1, -1, -1, -1, -1, -1, -1, -1
+    
+    file_size = _u32(buf, 4)
+    audio_format = num_channels = sample_rate = byte_rate = block_align = bits_per_sample = -1
+    data_size = -1
+    i = 12
+    while i + 8 <= n and (audio_format < 0 or data_size < 0):
+        chunk_size = _u32(buf, i + 4)
+        # b'fmt '
+        if buf[i] == 102 and buf[i + 1] == 109 and buf[i + 2] == 116 and buf[i + 3] == 32:
+            if i + 24 > n:
+                break
+            audio_format = _u16(buf, i + 8)
+            num_channels = _u16(buf, i + 10)
+            sample_rate = _u32(buf, i + 12)
+            byte_rate = _u32(buf, i + 16)
+            block_align = _u16(buf, i + 20)
+            bits_per_sample = _u16(buf, i + 22)
+        # b'data'
+        elif buf[i] == 100 and buf[i + 1] == 97 and buf[i + 2] == 116 and buf[i + 3] == 97:
+            data_size = chunk_size
+        # LIST/JUNKなどはスキップ、奇数長は1バイトのパディングあり
+        i += 8 + ((chunk_size + 1) & ~1)
+    
+    return (audio_format, num_channels, sample_rate, byte_rate,
+            block_align, bits_per_sample, file_size, data_size)
+
+if NUMBA_AVAILABLE:
+    _u16 = njit(cache=True)(_u16)
+    _u32 = njit(cache=True)(_u32)
+    parse_wav_header_bytes = njit(cache=True)(parse_wav_header_bytes)
+
+def read_header_bytes(wav_path, size):
+    """ファイル先頭sizeバイトを読み込み（対応OSではos.pread + posix_fadviseで読み込み）"""
+    if not hasattr(os, 'pread'):
+        with open(wav_path, 'rb') as f:
+            return f.read(size)
+    
+    fd = os.open(wav_path, os.O_RDONLY)
+    try:
+        if hasattr(os, 'posix_fadvise'):
+            os.posix_fadvise(fd, 0, size, os.POSIX_FADV_WILLNEED)
+        return os.pread(fd, size, 0)
+    finally:
+        os.close(fd)
+
+def read_wav_header_jit(wav_file):
+    """numbaでコンパイルしたパーサーで先頭4KiBからヘッダー情報を取得"""
+    header = read_header_bytes(wav_file, JIT_HEADER_READ_SIZE)
+    buf = np.frombuffer(header, dtype=np.uint8).astype(np.int64)
+    
+    (audio_format, num_channels, sample_rate, byte_rate,
+     block_align, bits_per_sample, file_size, data_size) = parse_wav_header_bytes(buf)
+    
+    bytes_per_second = sample_rate * num_channels * (bits_per_sample // 8)
+    if audio_format < 0 or data_size < 0 or bytes_per_second <= 0:
+        return None
+    
+    return {
+        'audio_format': audio_format,
+        'num_channels': num_channels,
+        'sample_rate': sample_rate,
+        'byte_rate': byte_rate,
+        'block_align': block_align,
+        'bits_per_sample': bits_per_sample,
+        'file_size': file_size,
+        'duration': data_size / bytes_per_second
+    }
+
+# ヘッダー情報のディスクキャッシュ（(mtime, size)が一致する間は再解析しない）
+HEADER_CACHE_FILE = 'raw/.wav_header_cache'
+_header_disk_cache = None
+_header_disk_cache_lock = threading.Lock()
 
-def read_wav_header(wav_file):
-    """WAVファイルのヘッダー情報を読み込み"""
+def read_wav_header(wav_path):
+    """WAVファイルのヘッダー情報を読み込み（ディスクにキャッシュ）"""
+    try:
+        st = os.stat(wav_path)
+    except OSError:
+        return None
+    stamp = (st.st_mtime_ns, st.st_size)
+    
+    if _header_disk_cache is not None:
+        with _header_disk_cache_lock:
+            cached = _header_disk_cache.get(wav_path)
+        if cached and cached[0] == stamp:
+            return cached[1]
+    
+    header_info = parse_wav_header(wav_path)
+    
+    if _header_disk_cache is not None and header_info is not None:
+        with _header_disk_cache_lock:
+            _header_disk_cache[wav_path] = (stamp, header_info)
+    return header_info
+
+def parse_wav_header(wav_file):
+    """WAVファイルのヘッダー情報を解析"""
+    # まずnumba版（利用できない場合はmmap版）で解析し、見つからない場合のみチャンクを順に走査
+    fast_reader = read_wav_header_jit if NUMBA_AVAILABLE else read_wav_header_mmap
+    try:
+        header_info = fast_reader(wav_file)
+        if header_info:
+            return header_info
+    except (OSError, ValueError, struct.error):
+        pass
+    
     try:
         with open(wav_file, 'rb') as f:
             # RIFFヘッダー
@@ -28,31 +230,31 @@ def read_wav_header(wav_file):
                 return None
             
             # ファイルサイズ
-            file_size = struct.unpack('<I', f.read(4))[0]
+            file_size = _U32.unpack(f.read(4))[0]
             
             # WAVEヘッダー
             wave = f.read(4)
             if wave != b'WAVE':
                 return None
             
-            # チャンクを探す
-            while True:
-                chunk_id = f.read(4)
-                if not chunk_id:
+            # チャンクを探す（fmt/dataの順序は問わず、間のLIST/JUNKなどはスキップ）
+            fmt = None
+            data_size = None
+            while fmt is None or data_size is None:
+                chunk_header = f.read(_CHUNK_HEADER.size)
+                if len(chunk_header) < _CHUNK_HEADER.size:
                     break
                 
-                chunk_size = struct.unpack('<I', f.read(4))[0]
+                chunk_id, chunk_size = _CHUNK_HEADER.unpack(chunk_header)
+                # 奇数長のチャンクは1バイトのパディングあり
+                padded_size = (chunk_size + 1) & ~1
                 
                 if chunk_id == b'fmt ':
-                    # フォーマット情報
-                    audio_format = struct.unpack('<H', f.read(2))[0]
-                    num_channels = struct.unpack('<H', f.read(2))[0]
-                    sample_rate = struct.unpack('<I', f.read(4))[0]
-                    byte_rate = struct.unpack('<I', f.read(4))[0]
-                    block_align = struct.unpack('<H', f.read(2))[0]
-                    bits_per_sample = struct.unpack('<H', f.read(2))[0]
+                    # フォーマット情報（16バイトを1回で読み込み）
+                    (audio_format, num_channels, sample_rate,
+                     byte_rate, block_align, bits_per_sample) = _FMT_FIELDS.unpack(f.read(_FMT_FIELDS.size))
                     
-                    return {
+                    fmt = {
                         'audio_format': audio_format,
                         'num_channels': num_channels,
                         'sample_rate': sample_rate,
@@ -61,28 +263,23 @@ def read_wav_header(wav_file):
                         'bits_per_sample': bits_per_sample,
                         'file_size': file_size
                     }
+                    f.seek(padded_size - _FMT_FIELDS.size, 1)
                 elif chunk_id == b'data':
-                    # データチャンクのサイズから音声長を計算
-                    if 'sample_rate' in locals():
-                        duration = chunk_size / (sample_rate * num_channels * (bits_per_sample // 8))
-                        return {
-                            'audio_format': audio_format,
-                            'num_channels': num_channels,
-                            'sample_rate': sample_rate,
-                            'byte_rate': byte_rate,
-                            'block_align': block_align,
-                            'bits_per_sample': bits_per_sample,
-                            'file_size': file_size,
-                            'duration': duration
-                        }
-                    else:
-                        # fmtチャンクがまだ見つかっていない場合
-                        f.seek(chunk_size, 1)
+                    # データチャンクのサイズを記録（音声長はfmtと揃ってから計算）
+                    data_size = chunk_size
+                    if fmt is None:
+                        f.seek(padded_size, 1)
                 else:
-                    # その他のチャンクをスキップ
-                    f.seek(chunk_size, 1)
+                    f.seek(padded_size, 1)
             
-            return None
+            if fmt is None:
+                return None
+            
+            # データチャンクのサイズから音声長を計算
+            bytes_per_second = fmt['sample_rate'] * fmt['num_channels'] * (fmt['bits_per_sample'] // 8)
+            if data_size is not None and bytes_per_second:
+                fmt['duration'] = data_size / bytes_per_second
+            return fmt
             
     except Exception as e:
         return None
@@ -95,7 +292,6 @@ def get_audio_duration(wav_file):
             return header_info['duration']
         else:
             # データチャンクが見つからない場合、ファイルサイズから推定
-            header_info = read_wav_header(wav_file)
             if header_info:
                 # ファイルサイズから概算（ヘッダー部分を除く）
                 data_size = header_info['file_size'] - 44  # 標準WAVヘッダーサイズ
@@ -106,13 +302,62 @@ def get_audio_duration(wav_file):
         print(f"エラー: {wav_file}の読み込みに失敗: {e}")
         return None
 
-def analyze_durations():
-    """音声長を分析"""
+def scan_wavs(wavs_dir):
+    """os.scandirでWAVファイルのパス一覧を取得（Path生成やfnmatchを省く）"""
+    with os.scandir(wavs_dir) as entries:
+        return [entry.path for entry in entries if entry.name.endswith('.wav')]
+
+def file_stem(wav_path):
+    """パス文字列から拡張子なしのファイル名を取得"""
+    return os.path.splitext(os.path.basename(wav_path))[0]
+
+def load_duration_cache(csv_file, wavs_dir, wav_files):
+    """キャッシュCSVから音声長と失敗ファイルを読み込み（wavsフォルダより古い、またはファイル構成が異なる場合はNone）"""
+    if not csv_file.exists() or csv_file.stat().st_mtime < wavs_dir.stat().st_mtime:
+        return None
+    
+    paths = []
+    durations = array.array('d')
+    failed_files = []
+    with open(csv_file, 'r', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        next(reader, None)  # ヘッダーをスキップ
+        for row in reader:
+            if len(row) >= 2:
+                wav_path = os.path.join(wavs_dir, f"{row[0]}.wav")
+                # 音声長が空の行は前回の解析で失敗したファイル
+                if row[1]:
+                    paths.append(wav_path)
+                    durations.append(float(row[1]))
+                else:
+                    failed_files.append(wav_path)
+    
+    # キャッシュにないファイルや削除されたファイルがあれば、キャッシュは古いとみなす
+    cached_stems = {file_stem(p) for p in paths}
+    cached_stems.update(file_stem(p) for p in failed_files)
+    if cached_stems != {file_stem(p) for p in wav_files}:
+        return None
+    return paths, durations, failed_files
+
+def save_duration_cache(csv_file, paths, durations, failed_files):
+    """音声長をこのスクリプト専用のキャッシュCSVに保存（失敗ファイルは音声長を空欄にして記録）"""
+    with open(csv_file, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['file_id', 'duration_seconds', 'language'])
+        for wav_file, duration in zip(paths, durations):
+            stem = file_stem(wav_file)
+            writer.writerow([stem, f"{duration:.6f}", stem.split('_')[0]])
+        for wav_file in failed_files:
+            stem = file_stem(wav_file)
+            writer.writerow([stem, '', stem.split('_')[0]])
+
+def analyze_durations(plot=False):
+    """音声長を分析（plot=Trueの場合は分布図も作成）"""
     print("=== NumPyを使用したWAVファイル音声長分析 ===\n")
     print("IEEE浮動小数点フォーマット対応\n")
     
     wavs_dir = Path('raw/wavs')
-    wav_files = list(wavs_dir.glob('*.wav'))
+    wav_files = scan_wavs(wavs_dir)
     
     if not wav_files:
         print("WAVファイルが見つかりません")
@@ -121,30 +366,56 @@ def analyze_durations():
     print(f"分析対象: {len(wav_files)}ファイル")
     print("音声長を計算中...")
     
-    # 音声長を取得
-    durations = []
-    lang_durations = defaultdict(list)
+    # 音声長を取得（キャッシュがあれば再利用）
+    cache_file = Path(DURATION_CACHE_FILE)
+    cached = load_duration_cache(cache_file, wavs_dir, wav_files)
     failed_files = []
     
-    for i, wav_file in enumerate(wav_files):
-        if i % 1000 == 0:
-            print(f"  進捗: {i}/{len(wav_files)}")
+    if cached:
+        paths, durations, failed_files = cached
+        print(f"  キャッシュを使用: {cache_file}")
+    else:
+        paths = []
+        durations = array.array('d')  # 生のdoubleを連続領域に保持
+        global _header_disk_cache
+        with shelve.open(HEADER_CACHE_FILE) as header_cache:
+            _header_disk_cache = header_cache
+            try:
+                with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+                    results = list(tqdm(executor.map(get_audio_duration, wav_files),
+                                        total=len(wav_files), desc="音声長取得中"))
+            finally:
+                _header_disk_cache = None
         
-        duration = get_audio_duration(wav_file)
-        if duration is not None:
-            durations.append(duration)
-            # 言語別に分類
-            lang_code = wav_file.stem.split('_')[0]
-            lang_durations[lang_code].append(duration)
-        else:
-            failed_files.append(wav_file)
+        for wav_file, duration in zip(wav_files, results):
+            if duration is not None:
+                paths.append(wav_file)
+                durations.append(duration)
+            else:
+                failed_files.append(wav_file)
+        
+        save_duration_cache(cache_file, paths, durations, failed_files)
     
     if not durations:
         print("有効な音声ファイルが見つかりませんでした")
         return
     
     # 統計計算
-    durations = np.array(durations)
+    durations = np.frombuffer(durations, dtype=np.float64).copy()
+    
+    # 言語別に分類（言語を整数コード化し、コード順に並べた配列のスライスとして保持）
+    lang_names, lang_codes = np.unique([file_stem(p).split('_')[0] for p in paths], return_inverse=True)
+    lang_counts = np.bincount(lang_codes)
+    lang_means = np.bincount(lang_codes, weights=durations) / lang_counts
+    lang_order = np.argsort(lang_codes, kind='stable')
+    lang_sorted_durations = durations[lang_order]
+    lang_starts = np.concatenate(([0], np.cumsum(lang_counts)[:-1]))
+    lang_mins = np.minimum.reduceat(lang_sorted_durations, lang_starts)
+    lang_maxs = np.maximum.reduceat(lang_sorted_durations, lang_starts)
+    lang_durations = {
+        lang_code: lang_sorted_durations[start:start + count]
+        for lang_code, start, count in zip(lang_names, lang_starts, lang_counts)
+    }
     
     print(f"\n=== 全体統計 ===")
     print(f"有効ファイル数: {len(durations)}")
@@ -176,45 +447,34 @@ def analyze_durations():
     print(f"  最大値: {range_80_max:.3f}秒")
     print(f"  範囲: {range_80_max - range_80_min:.3f}秒")
     
-    # 最小・最大のファイルを特定
-    min_file = None
-    max_file = None
-    
-    for wav_file in wav_files:
-        duration = get_audio_duration(wav_file)
-        if duration is not None:
-            if abs(duration - min_duration) < 0.001:  # 浮動小数点の比較
-                min_file = wav_file
-            if abs(duration - max_duration) < 0.001:  # 浮動小数点の比較
-                max_file = wav_file
+    # 最小・最大のファイルを特定（1回目の走査結果から取得）
+    min_file = paths[int(np.argmin(durations))]
+    max_file = paths[int(np.argmax(durations))]
     
     print(f"\n=== 極値ファイル ===")
     if min_file:
-        print(f"最短ファイル: {min_file.name}")
+        print(f"最短ファイル: {os.path.basename(min_file)}")
         print(f"  音声長: {min_duration:.3f}秒")
-        print(f"  言語: {min_file.stem.split('_')[0]}")
+        print(f"  言語: {file_stem(min_file).split('_')[0]}")
     
     if max_file:
-        print(f"最長ファイル: {max_file.name}")
+        print(f"最長ファイル: {os.path.basename(max_file)}")
         print(f"  音声長: {max_duration:.3f}秒")
-        print(f"  言語: {max_file.stem.split('_')[0]}")
+        print(f"  言語: {file_stem(max_file).split('_')[0]}")
     
     # 言語別統計
     print(f"\n=== 言語別統計 ===")
-    for lang_code in sorted(lang_durations.keys()):
-        lang_durs = np.array(lang_durations[lang_code])
+    for i, lang_code in enumerate(lang_names):
         print(f"\n{lang_code}:")
-        print(f"  ファイル数: {len(lang_durs)}")
-        print(f"  最小: {np.min(lang_durs):.3f}秒")
-        print(f"  最大: {np.max(lang_durs):.3f}秒")
-        print(f"  平均: {np.mean(lang_durs):.3f}秒")
-        print(f"  中央値: {np.median(lang_durs):.3f}秒")
+        print(f"  ファイル数: {lang_counts[i]}")
+        print(f"  最小: {lang_mins[i]:.3f}秒")
+        print(f"  最大: {lang_maxs[i]:.3f}秒")
+        print(f"  平均: {lang_means[i]:.3f}秒")
+        print(f"  中央値: {np.median(lang_durations[lang_code]):.3f}秒")
     
     # 分布の可視化
-    if MATPLOTLIB_AVAILABLE:
+    if plot:
         create_duration_histogram(durations, lang_durations)
-    else:
-        print("\n分布図の作成をスキップしました（matplotlibが利用できません）")
     
     return {
         'durations': durations,
@@ -231,8 +491,8 @@ def analyze_durations():
 
 def create_duration_histogram(durations, lang_durations):
     """音声長の分布を可視化"""
-    if not MATPLOTLIB_AVAILABLE:
-        print("matplotlibが利用できないため、分布図の作成をスキップしました")
+    if load_matplotlib() is None:
+        print("\nmatplotlibが利用できないため、分布図の作成をスキップしました")
         return
         
     plt.figure(figsize=(15, 10))
@@ -303,11 +563,19 @@ def print_summary(stats):
     
     print(f"\n🎯 極値ファイル:")
     if stats['min_file']:
-        print(f"   最短: {stats['min_file'].name} ({stats['min_duration']:.3f}秒)")
+        print(f"   最短: {os.path.basename(stats['min_file'])} ({stats['min_duration']:.3f}秒)")
     if stats['max_file']:
-        print(f"   最長: {stats['max_file'].name} ({stats['max_duration']:.3f}秒)")
+        print(f"   最長: {os.path.basename(stats['max_file'])} ({stats['max_duration']:.3f}秒)")
 
 if __name__ == "__main__":
-    stats = analyze_durations()
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--plot', dest='plot', action='store_true',
+                        help='音声長の分布図を作成する')
+    parser.add_argument('--no-plot', dest='plot', action='store_false',
+                        help='分布図を作成しない（デフォルト）')
+    parser.set_defaults(plot=False)
+    args = parser.parse_args()
+    
+    stats = analyze_durations(plot=args.plot)
     if stats:
         print_summary(stats) 
\ No newline at end of file
@@ -4,29 +4,141 @@ WAVファイルの音声長を詳細に分析するスクリプト（簡易版
 """
 
 import os
-import wave
+import csv
+import array
+import struct
 import numpy as np
 from pathlib import Path
-from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from tqdm import tqdm
+
+# ヘッダー読み込みはI/O待ちが中心のため、CPU数より多めのスレッドで並列化
+MAX_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+
+# fmt/dataチャンクは通常先頭100バイト程度に収まるため、まず1ページ分だけ読む（収まらない場合のみ追加で読む）
+HEADER_READ_SIZE = 4096
+
+# 音声長のキャッシュ（raw/audio_durations.csvはcreate_audio_duration_csv.pyの成果物のため別ファイルに保存）
+DURATION_CACHE_FILE = 'raw/.duration_cache_simple.csv'
+
+def read_header_bytes(wav_path, size):
+    """ファイル先頭sizeバイトを読み込み（対応OSではos.pread + posix_fadviseで読み込み）"""
+    if not hasattr(os, 'pread'):
+        with open(wav_path, 'rb') as f:
+            return f.read(size)
+    
+    fd = os.open(wav_path, os.O_RDONLY)
+    try:
+        if hasattr(os, 'posix_fadvise'):
+            os.posix_fadvise(fd, 0, size, os.POSIX_FADV_WILLNEED)
+        return os.pread(fd, size, 0)
+    finally:
+        os.close(fd)
+
+def read_range(wav_path, header, offset, size):
+    """先頭バッファ内の範囲はそこから、範囲外はファイルから直接読み込み（大きなLIST/JUNKチャンクの後ろ用）"""
+    if offset + size <= len(header):
+        return header[offset:offset + size]
+    # バッファがファイル全体より短い場合はEOFに達しているため読み直さない
+    if len(header) < HEADER_READ_SIZE:
+        return header[offset:offset + size]
+    with open(wav_path, 'rb') as f:
+        if hasattr(os, 'pread'):
+            return os.pread(f.fileno(), size, offset)
+        f.seek(offset)
+        return f.read(size)
 
 def get_audio_duration(wav_file):
     """WAVファイルの音声長を取得（秒）"""
     try:
-        with wave.open(str(wav_file), 'rb') as wav:
-            frames = wav.getnframes()
-            rate = wav.getframerate()
-            duration = frames / float(rate)
-            return duration
+        header = read_header_bytes(wav_file, HEADER_READ_SIZE)
+        
+        if header[:4] != b'RIFF' or header[8:12] != b'WAVE':
+            raise ValueError("RIFF/WAVEヘッダーが不正")
+        
+        # チャンクを順に走査（LIST/JUNKなどはスキップ、先頭バッファを越えたらファイルから読んでEOFまで続ける）
+        byte_rate = None
+        offset = 12
+        while True:
+            chunk_header = read_range(wav_file, header, offset, 8)
+            if len(chunk_header) < 8:
+                break
+            chunk_id = chunk_header[:4]
+            chunk_size = struct.unpack_from('<I', chunk_header, 4)[0]
+            
+            if chunk_id == b'fmt ':
+                fmt_byte_rate = read_range(wav_file, header, offset + 16, 4)
+                if len(fmt_byte_rate) < 4:
+                    break
+                byte_rate = struct.unpack('<I', fmt_byte_rate)[0]
+            elif chunk_id == b'data':
+                if not byte_rate:
+                    raise ValueError("dataチャンクの前にfmtチャンクがありません")
+                return chunk_size / byte_rate
+            
+            # 奇数長のチャンクは1バイトのパディングが入る
+            offset += 8 + ((chunk_size + 1) & ~1)
+        
+        raise ValueError("dataチャンクが見つかりません")
     except Exception as e:
         print(f"エラー: {wav_file}の読み込みに失敗: {e}")
         return None
 
+def scan_wavs(wavs_dir):
+    """os.scandirでWAVファイルのパス一覧を取得（Path生成やfnmatchを省く）"""
+    with os.scandir(wavs_dir) as entries:
+        return [entry.path for entry in entries if entry.name.endswith('.wav')]
+
+def file_stem(wav_path):
+    """パス文字列から拡張子なしのファイル名を取得"""
+    return os.path.splitext(os.path.basename(wav_path))[0]
+
+def load_duration_cache(csv_file, wavs_dir, wav_files):
+    """キャッシュCSVから音声長と失敗ファイルを読み込み（wavsフォルダより古い、またはファイル構成が異なる場合はNone）"""
+    if not csv_file.exists() or csv_file.stat().st_mtime < wavs_dir.stat().st_mtime:
+        return None
+    
+    paths = []
+    durations = array.array('d')
+    failed_files = []
+    with open(csv_file, 'r', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        next(reader, None)  # ヘッダーをスキップ
+        for row in reader:
+            if len(row) >= 2:
+                wav_path = os.path.join(wavs_dir, f"{row[0]}.wav")
+                # 音声長が空の行は前回の解析で失敗したファイル
+                if row[1]:
+                    paths.append(wav_path)
+                    durations.append(float(row[1]))
+                else:
+                    failed_files.append(wav_path)
+    
+    # キャッシュにないファイルや削除されたファイルがあれば、キャッシュは古いとみなす
+    cached_stems = {file_stem(p) for p in paths}
+    cached_stems.update(file_stem(p) for p in failed_files)
+    if cached_stems != {file_stem(p) for p in wav_files}:
+        return None
+    return paths, durations, failed_files
+
+def save_duration_cache(csv_file, paths, durations, failed_files):
+    """音声長をこのスクリプト専用のキャッシュCSVに保存（失敗ファイルは音声長を空欄にして記録）"""
+    with open(csv_file, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['file_id', 'duration_seconds', 'language'])
+        for wav_file, duration in zip(paths, durations):
+            stem = file_stem(wav_file)
+            writer.writerow([stem, f"{duration:.6f}", stem.split('_')[0]])
+        for wav_file in failed_files:
+            stem = file_stem(wav_file)
+            writer.writerow([stem, '', stem.split('_')[0]])
+
 def analyze_durations():
     """音声長を分析"""
     print("=== WAVファイル音声長分析 ===\n")
     
     wavs_dir = Path('raw/wavs')
-    wav_files = list(wavs_dir.glob('*.wav'))
+    wav_files = scan_wavs(wavs_dir)
     
     if not wav_files:
         print("WAVファイルが見つかりません")
@@ -35,40 +147,64 @@ def analyze_durations():
     print(f"分析対象: {len(wav_files)}ファイル")
     print("音声長を計算中...")
     
-    # 音声長を取得
-    durations = []
-    lang_durations = defaultdict(list)
+    # 音声長を取得（キャッシュがあれば再利用）
+    cache_file = Path(DURATION_CACHE_FILE)
+    cached = load_duration_cache(cache_file, wavs_dir, wav_files)
     failed_files = []
     
-    for i, wav_file in enumerate(wav_files):
-        if i % 5000 == 0:
-            print(f"  進捗: {i}/{len(wav_files)}")
+    if cached:
+        paths, durations, failed_files = cached
+        print(f"  キャッシュを使用: {cache_file}")
+    else:
+        paths = []
+        durations = array.array('d')  # 生のdoubleを連続領域に保持
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            results = list(tqdm(executor.map(get_audio_duration, wav_files),
+                                total=len(wav_files), desc="音声長取得中"))
+        
+        for wav_file, duration in zip(wav_files, results):
+            if duration is not None:
+                paths.append(wav_file)
+                durations.append(duration)
+            else:
+                failed_files.append(wav_file)
         
-        duration = get_audio_duration(wav_file)
-        if duration is not None:
-            durations.append(duration)
-            # 言語別に分類
-            lang_code = wav_file.stem.split('_')[0]
-            lang_durations[lang_code].append(duration)
-        else:
-            failed_files.append(wav_file)
+        save_duration_cache(cache_file, paths, durations, failed_files)
     
     if not durations:
         print("有効な音声ファイルが見つかりませんでした")
         return
     
     # 統計計算
-    durations = np.array(durations)
+    durations = np.frombuffer(durations, dtype=np.float64).copy()
+    
+    # 言語別に分類（言語を整数コード化し、コード順に並べた配列のスライスとして保持）
+    lang_names, lang_codes = np.unique([file_stem(p).split('_')[0] for p in paths], return_inverse=True)
+    lang_counts = np.bincount(lang_codes)
+    lang_means = np.bincount(lang_codes, weights=durations) / lang_counts
+    lang_order = np.argsort(lang_codes, kind='stable')
+    lang_sorted_durations = durations[lang_order]
+    lang_starts = np.concatenate(([0], np.cumsum(lang_counts)[:-1]))
+    lang_mins = np.minimum.reduceat(lang_sorted_durations, lang_starts)
+    lang_maxs = np.maximum.reduceat(lang_sorted_durations, lang_starts)
+    lang_durations = {
+        lang_code: lang_sorted_durations[start:start + count]
+        for lang_code, start, count in zip(lang_names, lang_starts, lang_counts)
+    }
     
     print(f"\n=== 全体統計 ===")
     print(f"有効ファイル数: {len(durations)}")
     print(f"失敗ファイル数: {len(failed_files)}")
     
+    # パーセンタイルは1回のnp.percentile呼び出しでまとめて計算（内部のpartitionを共有）
+    percentiles = [1, 5, 10, 25, 50, 75, 90, 95, 99]
+    percentile_values = dict(zip(percentiles, np.percentile(durations, percentiles)))
+    
     # 基本統計
     min_duration = np.min(durations)
     max_duration = np.max(durations)
     mean_duration = np.mean(durations)
-    median_duration = np.median(durations)
+    median_duration = percentile_values[50]
     
     print(f"\n基本統計:")
     print(f"  最小音声長: {min_duration:.3f}秒")
@@ -77,79 +213,53 @@ def analyze_durations():
     print(f"  中央値: {median_duration:.3f}秒")
     
     # 中央値から80%の範囲
-    sorted_durations = np.sort(durations)
-    total_files = len(sorted_durations)
-    start_idx = int(total_files * 0.1)  # 下位10%
-    end_idx = int(total_files * 0.9)    # 上位10%
-    
-    range_80_min = sorted_durations[start_idx]
-    range_80_max = sorted_durations[end_idx]
+    range_80_min = percentile_values[10]  # 下位10%
+    range_80_max = percentile_values[90]  # 上位10%
     
     print(f"\n中央値から80%の範囲（上位・下位10%を除く）:")
     print(f"  最小値: {range_80_min:.3f}秒")
     print(f"  最大値: {range_80_max:.3f}秒")
     print(f"  範囲: {range_80_max - range_80_min:.3f}秒")
     
-    # 最小・最大のファイルを特定
-    min_file = None
-    max_file = None
-    
-    print(f"\n極値ファイルを特定中...")
-    for wav_file in wav_files:
-        duration = get_audio_duration(wav_file)
-        if duration is not None:
-            if abs(duration - min_duration) < 0.001:  # 浮動小数点の誤差を考慮
-                min_file = wav_file
-            if abs(duration - max_duration) < 0.001:
-                max_file = wav_file
+    # 最小・最大のファイルを特定（1回目の走査結果から取得）
+    min_file = paths[int(np.argmin(durations))]
+    max_file = paths[int(np.argmax(durations))]
     
     print(f"\n=== 極値ファイル ===")
     if min_file:
-        print(f"最短ファイル: {min_file.name}")
+        print(f"最短ファイル: {os.path.basename(min_file)}")
         print(f"  音声長: {min_duration:.3f}秒")
-        print(f"  言語: {min_file.stem.split('_')[0]}")
+        print(f"  言語: {file_stem(min_file).split('_')[0]}")
     
     if max_file:
-        print(f"最長ファイル: {max_file.name}")
+        print(f"最長ファイル: {os.path.basename(max_file)}")
         print(f"  音声長: {max_duration:.3f}秒")
-        print(f"  言語: {max_file.stem.split('_')[0]}")
+        print(f"  言語: {file_stem(max_file).split('_')[0]}")
     
     # 言語別統計
     print(f"\n=== 言語別統計 ===")
-    for lang_code in sorted(lang_durations.keys()):
-        lang_durs = np.array(lang_durations[lang_code])
+    for i, lang_code in enumerate(lang_names):
         print(f"\n{lang_code}:")
-        print(f"  ファイル数: {len(lang_durs)}")
-        print(f"  最小: {np.min(lang_durs):.3f}秒")
-        print(f"  最大: {np.max(lang_durs):.3f}秒")
-        print(f"  平均: {np.mean(lang_durs):.3f}秒")
-        print(f"  中央値: {np.median(lang_durs):.3f}秒")
+        print(f"  ファイル数: {lang_counts[i]}")
+        print(f"  最小: {lang_mins[i]:.3f}秒")
+        print(f"  最大: {lang_maxs[i]:.3f}秒")
+        print(f"  平均: {lang_means[i]:.3f}秒")
+        print(f"  中央値: {np.median(lang_durations[lang_code]):.3f}秒")
     
     # 分布の詳細
     print(f"\n=== 分布の詳細 ===")
-    percentiles = [1, 5, 10, 25, 50, 75, 90, 95, 99]
-    for p in percentiles:
-        value = np.percentile(durations, p)
+    for p, value in percentile_values.items():
         print(f"  {p}パーセンタイル: {value:.3f}秒")
     
     # 時間範囲別のファイル数
     print(f"\n=== 時間範囲別ファイル数 ===")
-    ranges = [
-        (0, 5, "0-5秒"),
-        (5, 10, "5-10秒"),
-        (10, 15, "10-15秒"),
-        (15, 20, "15-20秒"),
-        (20, 30, "20-30秒"),
-        (30, 60, "30-60秒"),
-        (60, float('inf'), "60秒以上")
-    ]
-    
-    for min_time, max_time, label in ranges:
-        if max_time == float('inf'):
-            count = np.sum(durations >= min_time)
-        else:
-            count = np.sum((durations >= min_time) & (durations < max_time))
-        percentage = (count / len(durations)) * 100
+    # np.histogramで1回の走査で集計（最後のビンは右端を含むため「60秒以上」に一致）
+    bins = [0, 5, 10, 15, 20, 30, 60, np.inf]
+    labels = ["0-5秒", "5-10秒", "10-15秒", "15-20秒", "20-30秒", "30-60秒", "60秒以上"]
+    counts, _ = np.histogram(durations, bins=bins)
+    percentages = counts / len(durations) * 100
+    
+    for label, count, percentage in zip(labels, counts, percentages):
         print(f"  {label}: {count}ファイル ({percentage:.1f}%)")
     
     return {
@@ -181,9 +291,9 @@ def print_summary(stats):
     
     print(f"\n🎯 極値ファイル:")
     if stats['min_file']:
-        print(f"   最短: {stats['min_file'].name} ({stats['min_duration']:.3f}秒)")
+        print(f"   最短: {os.path.basename(stats['min_file'])} ({stats['min_duration']:.3f}秒)")
     if stats['max_file']:
-        print(f"   最長: {stats['max_file'].name} ({stats['max_duration']:.3f}秒)")
+        print(f"   最長: {os.path.basename(stats['max_file'])} ({stats['max_duration']:.3f}秒)")
 
 if __name__ == '__main__':
     stats = analyze_durations()
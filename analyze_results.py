@@ -15,23 +15,22 @@ def analyze_results():
     
     print("=== CSS10 to LJSpeech 変換結果分析 ===\n")
     
-    # 音声ファイル数
-    wav_files = list(wavs_dir.glob('*.wav'))
-    print(f"総音声ファイル数: {len(wav_files):,}")
+    # 音声ファイル数とサイズ（scandirのDirEntryでstatを1回の走査で取得）
+    wav_count = 0
+    total_size = 0
+    with os.scandir(wavs_dir) as entries:
+        for entry in entries:
+            if entry.name.endswith('.wav') and entry.is_file():
+                wav_count += 1
+                total_size += entry.stat(follow_symlinks=False).st_size
+    print(f"総音声ファイル数: {wav_count:,}")
     
     # 言語別統計
-    language_counts = Counter()
-    total_duration = 0
-    
+    # 言語コードは2列目（新しい形式: speaker=de → de）
+    # split('|', 2)で3列目以降は分割せず、ジェネレーターで直接Counterに渡す
     with open(metadata_file, 'r', encoding='utf-8') as f:
-        for line in f:
-            parts = line.strip().split('|')
-            if len(parts) >= 3:
-                filename = parts[0]
-                lang_code = parts[1]  # 新しい形式: speaker=de → de
-                text = parts[2]
-                
-                language_counts[lang_code] += 1
+        rows = (line.strip().split('|', 2) for line in f)
+        language_counts = Counter(parts[1] for parts in rows if len(parts) >= 3)
     
     print(f"\n=== 言語別統計 ===")
     total_files = sum(language_counts.values())
@@ -43,14 +42,10 @@ def analyze_results():
     print(f"\n合計: {total_files:,} ファイル")
     
     # ファイルサイズ統計
-    total_size = 0
-    for wav_file in wav_files:
-        total_size += wav_file.stat().st_size
-    
     total_size_gb = total_size / (1024**3)
     print(f"\n=== ファイルサイズ ===")
     print(f"総サイズ: {total_size_gb:.2f} GB")
-    print(f"平均ファイルサイズ: {total_size / len(wav_files) / 1024:.1f} KB")
+    print(f"平均ファイルサイズ: {total_size / wav_count / 1024:.1f} KB")
     
     # メタデータファイルサイズ
     metadata_size = metadata_file.stat().st_size
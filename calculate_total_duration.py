@@ -4,52 +4,65 @@ CSVファイルから総音声時間を計算するスクリプト
 """
 
 import csv
-import numpy as np
+from collections import defaultdict
 
-def calculate_total_duration():
-    """CSVファイルから総音声時間を計算"""
-    csv_file = 'raw/audio_durations.csv'
-    
-    durations = []
+# pandasのインポートを試行（利用できない場合はcsvモジュールで集計）
+try:
+    import pandas as pd
+    PANDAS_AVAILABLE = True
+except ImportError:
+    PANDAS_AVAILABLE = False
+
+def aggregate_durations_pandas(csv_file):
+    """pandasでCSVを一括で読み込み、総時間と言語別の[合計, 件数]を集計"""
+    df = pd.read_csv(csv_file, usecols=['duration_seconds', 'language'],
+                     dtype={'duration_seconds': 'float64', 'language': 'str'})
+    lang_stats = df.groupby('language')['duration_seconds'].agg(['sum', 'count'])
+    lang_agg = {lang_code: [row['sum'], int(row['count'])] for lang_code, row in lang_stats.iterrows()}
+    return df['duration_seconds'].sum(), len(df), lang_agg
+
+def aggregate_durations_csv(csv_file):
+    """csvモジュールで1回の走査で総時間と言語別の[合計, 件数]を集計"""
+    total_duration = 0.0
+    file_count = 0
+    lang_agg = defaultdict(lambda: [0.0, 0])
     
     with open(csv_file, 'r', encoding='utf-8') as f:
         reader = csv.reader(f)
         next(reader)  # ヘッダーをスキップ
         
         for row in reader:
-            if len(row) >= 2:
+            if len(row) >= 3:
                 duration = float(row[1])
-                durations.append(duration)
+                total_duration += duration
+                file_count += 1
+                agg = lang_agg[row[2]]
+                agg[0] += duration
+                agg[1] += 1
     
-    total_duration = sum(durations)
+    return total_duration, file_count, lang_agg
+
+def calculate_total_duration():
+    """CSVファイルから総音声時間を計算"""
+    csv_file = 'raw/audio_durations.csv'
+    
+    # CSVは1回だけ読み込み、総時間と言語別の集計を同時に行う
+    if PANDAS_AVAILABLE:
+        total_duration, file_count, lang_agg = aggregate_durations_pandas(csv_file)
+    else:
+        total_duration, file_count, lang_agg = aggregate_durations_csv(csv_file)
     
     print(f"=== 総音声時間計算 ===")
-    print(f"ファイル数: {len(durations):,}ファイル")
+    print(f"ファイル数: {file_count:,}ファイル")
     print(f"総音声時間: {total_duration:,.2f}秒")
     print(f"総音声時間: {total_duration/60:.2f}分")
     print(f"総音声時間: {total_duration/3600:.2f}時間")
     print(f"総音声時間: {total_duration/3600/24:.2f}日")
     
-    # 言語別の合計時間も計算
-    lang_durations = {}
-    
-    with open(csv_file, 'r', encoding='utf-8') as f:
-        reader = csv.reader(f)
-        next(reader)  # ヘッダーをスキップ
-        
-        for row in reader:
-            if len(row) >= 3:
-                duration = float(row[1])
-                language = row[2]
-                
-                if language not in lang_durations:
-                    lang_durations[language] = []
-                lang_durations[language].append(duration)
-    
+    # 言語別の合計時間
     print(f"\n=== 言語別音声時間 ===")
-    for lang_code in sorted(lang_durations.keys()):
-        lang_total = sum(lang_durations[lang_code])
-        lang_count = len(lang_durations[lang_code])
+    for lang_code in sorted(lang_agg.keys()):
+        lang_total, lang_count = lang_agg[lang_code]
         print(f"{lang_code}: {lang_total:,.2f}秒 ({lang_total/3600:.2f}時間) - {lang_count:,}ファイル")
 
 if __name__ == "__main__":
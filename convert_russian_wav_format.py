@@ -4,18 +4,40 @@
 """
 
 import os
+import argparse
 import subprocess
 import shutil
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
 from pathlib import Path
 from tqdm import tqdm
 
-def convert_wav_format(input_file, output_file):
-    """WAVファイルをIEEE浮動小数点からPCMに変換"""
+# soundfileのインポートを試行（利用できない場合はffmpegで変換）
+try:
+    import numpy as np
+    import soundfile as sf
+    SOUNDFILE_AVAILABLE = True
+except ImportError:
+    SOUNDFILE_AVAILABLE = False
+
+# librosaはサンプルレートの変換が必要な場合のみ使用
+try:
+    import librosa
+    LIBROSA_AVAILABLE = True
+except ImportError:
+    LIBROSA_AVAILABLE = False
+
+# 変換後のサンプルレート
+TARGET_SAMPLE_RATE = 22050
+
+def convert_wav_format_ffmpeg(input_file, output_file):
+    """ffmpegでWAVファイルをIEEE浮動小数点からPCMに変換"""
     try:
         # ffmpegを使用してIEEE浮動小数点（32bit）からPCM（16bit）に変換
         cmd = [
             'ffmpeg', '-y',  # 上書き許可
+            '-loglevel', 'error',  # エラーのみ出力（成否は終了コードで判定）
             '-i', str(input_file),  # 入力ファイル
+            '-threads', '1',  # 並列実行時にコアを奪い合わないよう1スレッドに制限
             '-acodec', 'pcm_s16le',  # 16bit PCM
             '-ar', '22050',  # サンプルレート 22050Hz
             '-ac', '1',  # モノラル
@@ -32,6 +54,73 @@ def convert_wav_format(input_file, output_file):
     except Exception as e:
         return False, str(e)
 
+def convert_wav_format_soundfile(input_file, output_file):
+    """soundfileでプロセスを起動せずにIEEE浮動小数点からPCMに変換"""
+    try:
+        data, sr = sf.read(str(input_file), dtype='float32')
+        
+        # モノラルにまとめる
+        if data.ndim > 1:
+            data = data.mean(axis=1)
+        
+        if sr != TARGET_SAMPLE_RATE:
+            if not LIBROSA_AVAILABLE:
+                # リサンプリングできない場合はffmpegで変換
+                return convert_wav_format_ffmpeg(input_file, output_file)
+            data = librosa.resample(data, orig_sr=sr, target_sr=TARGET_SAMPLE_RATE)
+        
+        # 16bit PCMにスケーリングして書き出し
+        pcm = np.clip(data * 32767.0, -32768, 32767).astype(np.int16)
+        sf.write(str(output_file), pcm, TARGET_SAMPLE_RATE, subtype='PCM_16')
+        return True, None
+        
+    except Exception as e:
+        return False, str(e)
+
+def convert_wav_format(input_file, output_file):
+    """WAVファイルをIEEE浮動小数点からPCMに変換"""
+    if SOUNDFILE_AVAILABLE:
+        return convert_wav_format_soundfile(input_file, output_file)
+    return convert_wav_format_ffmpeg(input_file, output_file)
+
+def backup_wav_file(wav_file, backup_file):
+    """元ファイルをバックアップへ移動（同一ファイルシステムならデータのコピーなし、別デバイスならコピー）"""
+    try:
+        os.replace(wav_file, backup_file)
+    except OSError:
+        shutil.copy2(wav_file, backup_file)
+
+def _convert_one(wav_file, backup_dir, wavs_dir):
+    """1ファイルをバックアップして変換し、元ファイルを置き換える"""
+    # バックアップファイルパス
+    backup_file = backup_dir / wav_file.name
+    
+    # 元ファイルをバックアップへ移動（コピーせずに退避）
+    try:
+        backup_wav_file(wav_file, backup_file)
+    except OSError as e:
+        return wav_file.name, False, f"バックアップ失敗: {e}"
+    
+    # 一時出力ファイル
+    temp_output = wavs_dir / f"{wav_file.stem}.temp.wav"
+    
+    # バックアップから変換実行
+    success, error = convert_wav_format(backup_file, temp_output)
+    
+    if success:
+        # 変換成功時は元の位置に配置
+        os.replace(temp_output, wav_file)
+    else:
+        # 変換失敗時はバックアップから復元
+        if temp_output.exists():
+            temp_output.unlink()
+        try:
+            shutil.copy2(backup_file, wav_file)
+        except OSError as e:
+            error = f"{error} / 復元失敗: {e}"
+    
+    return wav_file.name, success, error
+
 def verify_wav_header(wav_file):
     """WAVファイルのヘッダーを検証"""
     try:
@@ -55,11 +144,17 @@ def verify_wav_header(wav_file):
     except Exception as e:
         return False, str(e)
 
-def main():
+def scan_wavs(wavs_dir, prefix=''):
+    """os.scandirでprefixから始まるWAVファイルの一覧を取得（globのパターン照合を省く）"""
+    with os.scandir(wavs_dir) as entries:
+        return [Path(entry.path) for entry in entries
+                if entry.name.startswith(prefix) and entry.name.endswith('.wav') and entry.is_file()]
+
+def main(verify=False):
     print("=== ロシア語WAVファイルフォーマット変換 ===\n")
     
     wavs_dir = Path('raw/wavs')
-    ru_files = list(wavs_dir.glob('ru_*.wav'))
+    ru_files = scan_wavs(wavs_dir, 'ru_')
     
     if not ru_files:
         print("ロシア語WAVファイルが見つかりません")
@@ -129,32 +224,19 @@ def main():
     failed_count = 0
     failed_files = []
     
-    # プログレスバー付きで変換
-    for wav_file in tqdm(ru_files, desc="変換中"):
-        # バックアップファイルパス
-        backup_file = backup_dir / wav_file.name
-        
-        # 元ファイルをバックアップ
-        shutil.copy2(wav_file, backup_file)
+    # 各ファイルは独立しているため並列化（プロセス内変換はCPU処理のためプロセスプール、ffmpegはスレッドプール）
+    executor_class = ProcessPoolExecutor if SOUNDFILE_AVAILABLE else ThreadPoolExecutor
+    with executor_class(max_workers=os.cpu_count()) as executor:
+        futures = {executor.submit(_convert_one, wav_file, backup_dir, wavs_dir): wav_file for wav_file in ru_files}
         
-        # 一時出力ファイル
-        temp_output = wavs_dir / f"{wav_file.stem}.temp.wav"
-        
-        # 変換実行
-        success, error = convert_wav_format(wav_file, temp_output)
-        
-        if success:
-            # 変換成功時は元ファイルを置き換え
-            wav_file.unlink()
-            temp_output.rename(wav_file)
-            success_count += 1
-        else:
-            # 変換失敗時はバックアップから復元
-            if temp_output.exists():
-                temp_output.unlink()
-            shutil.copy2(backup_file, wav_file)
-            failed_count += 1
-            failed_files.append((wav_file.name, error))
+        # プログレスバー付きで変換
+        for future in tqdm(as_completed(futures), total=len(ru_files), desc="変換中"):
+            file_name, success, error = future.result()
+            if success:
+                success_count += 1
+            else:
+                failed_count += 1
+                failed_files.append((file_name, error))
     
     # 結果表示
     print(f"\n=== 変換結果 ===")
@@ -168,17 +250,23 @@ def main():
         if len(failed_files) > 10:
             print(f"  ... 他 {len(failed_files) - 10}ファイル")
     
-    # 変換後の検証
-    print(f"\n=== 変換後の検証 ===")
-    sample_files = list(wavs_dir.glob('ru_*.wav'))[:5]
-    
-    for wav_file in sample_files:
-        is_valid, info = verify_wav_header(wav_file)
-        if is_valid:
-            print(f"{wav_file.name}: {info}")
-            print(f"  ✅ WAVヘッダー正常")
-        else:
-            print(f"{wav_file.name}: ❌ {info}")
+    # 変換後の検証（ffmpegの終了コードで成否は判定済みのため、--verify指定時のみ）
+    if verify:
+        print(f"\n=== 変換後の検証 ===")
+        sample_files = list(wavs_dir.glob('ru_*.wav'))[:5]
+        
+        for wav_file in sample_files:
+            is_valid, info = verify_wav_header(wav_file)
+            if is_valid:
+                print(f"{wav_file.name}: {info}")
+                print(f"  ✅ WAVヘッダー正常")
+            else:
+                print(f"{wav_file.name}: ❌ {info}")
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--verify', action='store_true',
+                        help='変換後にサンプルファイルのWAVヘッダーを検証する')
+    args = parser.parse_args()
+    
+    main(verify=args.verify)
\ No newline at end of file
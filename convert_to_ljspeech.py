@@ -12,11 +12,15 @@ CSS10データセットをLJSpeechフォーマットに変換するスクリプ
 """
 
 import os
+import csv
 import shutil
 import pandas as pd
 from pathlib import Path
 from tqdm import tqdm
 import re
+from concurrent.futures import ThreadPoolExecutor
+
+from restore_original_formats import try_reflink
 
 # 言語コードのマッピング
 LANGUAGE_MAPPING = {
@@ -32,42 +36,70 @@ LANGUAGE_MAPPING = {
     'archive (10)': 'zh', # 中国語
 }
 
+# WAVファイルコピーの並列スレッド数
+COPY_WORKERS = 16
+
+# transcript.txt読み込み時のバッファサイズ
+TRANSCRIPT_READ_BUFFER_SIZE = 1024 * 1024
+
+# transcript.txtの行（ファイルパス|テキスト|...）の先頭2列を取り出す正規表現
+TRANSCRIPT_LINE_RE = re.compile(r'([^|]*)\|([^|]*)\|')
+
 def parse_transcript_line(line):
     """transcript.txtの1行をパースする"""
-    parts = line.strip().split('|')
-    if len(parts) >= 3:
-        file_path = parts[0]
-        text = parts[1]
-        return file_path, text
+    # 先頭2列だけをコンパイル済みの正規表現で取り出す（3列以上ある行のみ有効）
+    match = TRANSCRIPT_LINE_RE.match(line.strip())
+    if match:
+        return match.group(1, 2)
     return None, None
 
 def get_language_from_archive(archive_name):
     """アーカイブ名から言語コードを取得"""
     return LANGUAGE_MAPPING.get(archive_name, 'unknown')
 
-def find_wav_file(base_path, file_path_from_transcript):
-    """WAVファイルの実際の場所を探す"""
+def index_archive(root):
+    """アーカイブ配下の全ファイルの相対パス集合を作成（ツリー全体を1回だけ走査）"""
+    files = set()
+    for dirpath, _, filenames in os.walk(root):
+        rel_dir = os.path.relpath(dirpath, root)
+        prefix = '' if rel_dir == '.' else rel_dir.replace(os.sep, '/') + '/'
+        files.update(prefix + name for name in filenames)
+    return files
+
+def find_wav_file(base_path, file_path_from_transcript, available):
+    """WAVファイルの実際の場所を探す（availableはindex_archiveの結果）"""
     # transcript.txtのファイルパスから実際のWAVファイルを探す
-    possible_paths = [
-        base_path / file_path_from_transcript,
-        base_path / file_path_from_transcript.replace('/', '\\'),
-    ]
+    possible_paths = [file_path_from_transcript]
     
     # 言語サブフォルダも確認
     lang_code = get_language_from_archive(base_path.name)
     if lang_code != 'unknown':
-        lang_subfolder_paths = [
-            base_path / lang_code / file_path_from_transcript,
-            base_path / lang_code / file_path_from_transcript.replace('/', '\\'),
-        ]
-        possible_paths.extend(lang_subfolder_paths)
+        possible_paths.append(f"{lang_code}/{file_path_from_transcript}")
     
     for path in possible_paths:
-        if path.exists():
-            return path
+        if path in available:
+            return base_path / path
     
     return None
 
+def reflink_or_copy(src, dst):
+    """WAVファイルを配置（reflink → 通常コピーの順に試行）"""
+    # ハードリンクは元アーカイブとinodeを共有し、wavsをその場で書き換えるスクリプトで元データが壊れるため使わない
+    # reflinkの試行と非対応時の無効化はrestore_original_formats.pyと共通
+    if try_reflink(src, dst):
+        return
+    
+    shutil.copy2(src, dst)
+
+def copy_wav_file(job):
+    """WAVファイルを1つ配置する（失敗時はエラー内容を返す）"""
+    wav_file, new_wav_path, _ = job
+    try:
+        reflink_or_copy(wav_file, new_wav_path)
+        return None
+    except Exception as e:
+        return e
+
 def process_archive(archive_path, output_wavs_dir, metadata_rows):
     """1つのアーカイブを処理する"""
     archive_name = archive_path.name
@@ -84,48 +116,58 @@ def process_archive(archive_path, output_wavs_dir, metadata_rows):
     
     print(f"処理中: {archive_name} ({lang_code})")
     
-    # transcript.txtを読み込み
-    with open(transcript_file, 'r', encoding='utf-8') as f:
-        lines = f.readlines()
-    
     processed_count = 0
     skipped_count = 0
     
-    for line in tqdm(lines, desc=f"{archive_name}"):
-        file_path_from_transcript, text = parse_transcript_line(line)
-        
-        if not file_path_from_transcript or not text:
-            continue
-        
-        # WAVファイルを探す
-        wav_file = find_wav_file(archive_path, file_path_from_transcript)
-        
-        if not wav_file:
-            skipped_count += 1
-            continue
-        
-        # 新しいファイル名を生成
-        original_basename = Path(file_path_from_transcript).stem
-        new_basename = f"{lang_code}_{original_basename}"
-        new_wav_path = output_wavs_dir / f"{new_basename}.wav"
-        
-        # 重複チェック
-        if new_wav_path.exists():
-            skipped_count += 1
-            continue
-        
-        # WAVファイルをコピー
-        try:
-            shutil.copy2(wav_file, new_wav_path)
+    # アーカイブ内のファイル一覧を1回だけ作成（行ごとのexists()呼び出しを避ける）
+    available = index_archive(archive_path)
+    
+    # コピーするファイルを先に集める（コピー自体は後でまとめて並列実行）
+    copy_jobs = []
+    planned_paths = set()
+    
+    # transcript.txtを1行ずつ読み込みながら処理（全行をリストに読み込まない）
+    with open(transcript_file, 'r', encoding='utf-8', buffering=TRANSCRIPT_READ_BUFFER_SIZE) as f:
+        for line in tqdm(f, desc=f"{archive_name}"):
+            file_path_from_transcript, text = parse_transcript_line(line)
             
-            # メタデータ行を追加（speaker=を削除して言語コードのみ）
-            metadata_row = f"{new_basename}|{lang_code}|{text}"
-            metadata_rows.append(metadata_row)
+            if not file_path_from_transcript or not text:
+                continue
             
-            processed_count += 1
+            # WAVファイルを探す
+            wav_file = find_wav_file(archive_path, file_path_from_transcript, available)
+            
+            if not wav_file:
+                skipped_count += 1
+                continue
             
-        except Exception as e:
-            print(f"エラー: {wav_file}のコピーに失敗: {e}")
+            # 新しいファイル名を生成
+            original_basename = Path(file_path_from_transcript).stem
+            new_basename = f"{lang_code}_{original_basename}"
+            new_wav_path = output_wavs_dir / f"{new_basename}.wav"
+            
+            # 重複チェック（既存ファイルと、このアーカイブでコピー予定のファイル）
+            if new_wav_path in planned_paths or new_wav_path.exists():
+                skipped_count += 1
+                continue
+            planned_paths.add(new_wav_path)
+            
+            # メタデータ行（speaker=を削除して言語コードのみ）
+            metadata_row = (new_basename, lang_code, text)
+            copy_jobs.append((wav_file, new_wav_path, metadata_row))
+    
+    # WAVファイルをスレッドプールで並列にコピー（結果はジョブ順に返る）
+    with ThreadPoolExecutor(max_workers=COPY_WORKERS) as executor:
+        results = list(tqdm(executor.map(copy_wav_file, copy_jobs), total=len(copy_jobs),
+                            desc=f"{archive_name} コピー中"))
+    
+    for (wav_file, _, metadata_row), error in zip(copy_jobs, results):
+        if error is None:
+            # コピーに成功したファイルのみメタデータ行を追加
+            metadata_rows.append(metadata_row)
+            processed_count += 1
+        else:
+            print(f"エラー: {wav_file}のコピーに失敗: {error}")
             skipped_count += 1
     
     print(f"  - 処理済み: {processed_count}ファイル")
@@ -159,9 +201,10 @@ def main():
     
     # メタデータファイルを書き込み
     metadata_file = output_dir / 'metadata.csv'
-    with open(metadata_file, 'w', encoding='utf-8') as f:
-        for row in metadata_rows:
-            f.write(row + '\n')
+    # DataFrameにまとめてpandasのCライターで一括書き込み（引用符は付けずに'|'区切り）
+    metadata_df = pd.DataFrame(metadata_rows, columns=['id', 'lang', 'text'])
+    metadata_df.to_csv(metadata_file, sep='|', header=False, index=False, encoding='utf-8',
+                       quoting=csv.QUOTE_NONE, lineterminator='\n')
     
     # 結果を表示
     wav_count = len(list(output_wavs_dir.glob('*.wav')))
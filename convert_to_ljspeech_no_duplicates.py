@@ -32,13 +32,15 @@ LANGUAGE_MAPPING = {
     'archive (10)': 'zh', # 中国語
 }
 
+# transcript.txtの行（ファイルパス|テキスト|...）の先頭2列を取り出す正規表現
+TRANSCRIPT_LINE_RE = re.compile(r'([^|]*)\|([^|]*)\|')
+
 def parse_transcript_line(line):
     """transcript.txtの1行をパースする"""
-    parts = line.strip().split('|')
-    if len(parts) >= 3:
-        file_path = parts[0]
-        text = parts[1]
-        return file_path, text
+    # 先頭2列だけをコンパイル済みの正規表現で取り出す（3列以上ある行のみ有効）
+    match = TRANSCRIPT_LINE_RE.match(line.strip())
+    if match:
+        return match.group(1, 2)
     return None, None
 
 def get_language_from_archive(archive_name):
@@ -4,96 +4,112 @@ WAVファイルの音声長データをCSVファイルとして作成するス
 """
 
 import os
+import argparse
 import numpy as np
 import struct
 import csv
 from pathlib import Path
 from datetime import datetime
 
+# ヘッダー解析用に1回で読み込むバイト数（LIST/JUNKチャンクがあっても通常は収まる）
+HEADER_READ_SIZE = 4096
+
+# RIFFヘッダー・チャンクヘッダー・fmtチャンク本体の構造体
+_RIFF_HEADER = struct.Struct('<4sI4s')
+_CHUNK_HEADER = struct.Struct('<4sI')
+_FMT_FIELDS = struct.Struct('<HHIIHH')
+_FMT_KEYS = ('audio_format', 'num_channels', 'sample_rate', 'byte_rate', 'block_align', 'bits_per_sample')
+
 def read_wav_header(wav_file):
     """WAVファイルのヘッダー情報を読み込み"""
     try:
         with open(wav_file, 'rb') as f:
-            riff = f.read(4)
-            if riff != b'RIFF':
+            # 先頭をまとめて1回だけ読み込み、チャンクはメモリ上で走査
+            buf = f.read(HEADER_READ_SIZE)
+            if len(buf) < _RIFF_HEADER.size:
                 return None
             
-            file_size = struct.unpack('<I', f.read(4))[0]
-            wave = f.read(4)
-            if wave != b'WAVE':
+            riff, file_size, wave = _RIFF_HEADER.unpack_from(buf)
+            if riff != b'RIFF' or wave != b'WAVE':
                 return None
             
-            while True:
-                chunk_id = f.read(4)
-                if not chunk_id:
+            fmt = None
+            data_size = None
+            offset = 12
+            base = 0
+            while fmt is None or data_size is None:
+                # チャンクヘッダーとfmt本体がバッファに収まらない場合のみ、その位置から読み直す
+                if offset + 8 + _FMT_FIELDS.size > base + len(buf):
+                    f.seek(offset)
+                    buf = f.read(HEADER_READ_SIZE)
+                    base = offset
+                
+                pos = offset - base
+                if pos + 8 > len(buf):
                     break
                 
-                chunk_size = struct.unpack('<I', f.read(4))[0]
+                chunk_id, chunk_size = _CHUNK_HEADER.unpack_from(buf, pos)
                 
                 if chunk_id == b'fmt ':
-                    audio_format = struct.unpack('<H', f.read(2))[0]
-                    num_channels = struct.unpack('<H', f.read(2))[0]
-                    sample_rate = struct.unpack('<I', f.read(4))[0]
-                    byte_rate = struct.unpack('<I', f.read(4))[0]
-                    block_align = struct.unpack('<H', f.read(2))[0]
-                    bits_per_sample = struct.unpack('<H', f.read(2))[0]
-                    
-                    return {
-                        'audio_format': audio_format,
-                        'num_channels': num_channels,
-                        'sample_rate': sample_rate,
-                        'byte_rate': byte_rate,
-                        'block_align': block_align,
-                        'bits_per_sample': bits_per_sample,
-                        'file_size': file_size
-                    }
+                    if pos + 8 + _FMT_FIELDS.size > len(buf):
+                        break
+                    fmt = dict(zip(_FMT_KEYS, _FMT_FIELDS.unpack_from(buf, pos + 8)))
+                    fmt['file_size'] = file_size
                 elif chunk_id == b'data':
-                    if 'sample_rate' in locals():
-                        duration = chunk_size / (sample_rate * num_channels * (bits_per_sample // 8))
-                        return {
-                            'audio_format': audio_format,
-                            'num_channels': num_channels,
-                            'sample_rate': sample_rate,
-                            'byte_rate': byte_rate,
-                            'block_align': block_align,
-                            'bits_per_sample': bits_per_sample,
-                            'file_size': file_size,
-                            'duration': duration
-                        }
-                    else:
-                        f.seek(chunk_size, 1)
-                else:
-                    f.seek(chunk_size, 1)
+                    data_size = chunk_size
+                
+                offset += 8 + ((chunk_size + 1) & ~1)
             
-            return None
+            if fmt is None:
+                return None
+            
+            bytes_per_second = fmt['sample_rate'] * fmt['num_channels'] * (fmt['bits_per_sample'] // 8)
+            if data_size is not None and bytes_per_second:
+                fmt['duration'] = data_size / bytes_per_second
+            elif fmt['byte_rate']:
+                # dataチャンクから求められない場合は標準の44バイトヘッダーを仮定して推定
+                fmt['duration'] = (fmt['file_size'] - 44) / fmt['byte_rate']
+            return fmt
             
     except Exception as e:
         return None
 
 def get_audio_duration(wav_file):
     """WAVファイルの音声長を取得（秒）"""
-    try:
-        header_info = read_wav_header(wav_file)
-        if header_info and 'duration' in header_info:
-            return header_info['duration']
-        else:
-            header_info = read_wav_header(wav_file)
-            if header_info:
-                data_size = header_info['file_size'] - 44
-                duration = data_size / header_info['byte_rate']
-                return duration
-            return None
-    except Exception as e:
+    # read_wav_headerが推定値も含めて音声長を1回の解析で求める
+    header_info = read_wav_header(wav_file)
+    if header_info:
+        return header_info.get('duration')
+    return None
+
+# 変換済みファイル（pcm_s16le・22050Hz・モノラル）の標準ヘッダーサイズと1秒あたりのバイト数
+PCM16_HEADER_SIZE = 44
+PCM16_BYTES_PER_SECOND = 22050 * 2
+
+# CSS10の言語コード
+LANG_SET = frozenset(('de', 'el', 'es', 'fi', 'fr', 'hu', 'ja', 'nl', 'ru', 'zh'))
+
+# CSV書き込みのバッファサイズと、まとめて書き込む行数
+CSV_WRITE_BUFFER_SIZE = 1024 * 1024
+CSV_WRITE_BATCH_SIZE = 4096
+
+def get_duration_from_size(file_size):
+    """変換済みの前提でファイルサイズから音声長を算出（不自然な値ならNone）"""
+    data_size = file_size - PCM16_HEADER_SIZE
+    if data_size <= 0 or data_size % 2:
         return None
+    return data_size / PCM16_BYTES_PER_SECOND
 
-def create_audio_duration_csv():
+def create_audio_duration_csv(assume_converted=False):
     """音声長データをCSVファイルとして作成"""
     print("=== WAVファイル音声長データCSV作成 ===")
     print(f"開始時刻: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     print()
     
     wavs_dir = Path('raw/wavs')
-    wav_files = list(wavs_dir.glob('*.wav'))
+    # os.scandirのDirEntryをそのまま使う（Path生成とglobのパターン照合を省く）
+    with os.scandir(wavs_dir) as entries:
+        wav_files = [entry for entry in entries if entry.name.endswith('.wav')]
     
     if not wav_files:
         print("WAVファイルが見つかりません")
@@ -113,8 +129,10 @@ def create_audio_duration_csv():
     durations = []
     lang_counts = {}
     
-    with open(csv_file, 'w', newline='', encoding='utf-8') as f:
+    # 大きめのバッファで開き、行はまとめてwriterowsで書き込む
+    with open(csv_file, 'w', newline='', encoding='utf-8', buffering=CSV_WRITE_BUFFER_SIZE) as f:
         writer = csv.writer(f)
+        rows = []
         
         # ヘッダー行
         writer.writerow(['file_id', 'duration_seconds', 'language'])
@@ -124,18 +142,27 @@ def create_audio_duration_csv():
             if i % 1000 == 0:
                 print(f"  進捗: {i:,}/{total_files:,}")
             
-            # ファイルID（拡張子なしのファイル名）
-            file_id = wav_file.stem
+            # ファイルID（拡張子なしのファイル名、一覧は'.wav'で絞り込み済み）
+            file_id = wav_file.name[:-4]
             
-            # 言語コード
-            language = wav_file.stem.split('_')[0]
+            # 言語コード（ファイル名は常に「2文字の言語コード_」で始まる）
+            language = wav_file.name[:2]
+            if language not in LANG_SET:
+                language = 'unknown'
             
-            # 音声長を取得
-            duration = get_audio_duration(wav_file)
+            # 音声長を取得（変換済みならファイルを開かずにサイズから算出）
+            duration = None
+            if assume_converted:
+                duration = get_duration_from_size(wav_file.stat().st_size)
+            if duration is None:
+                duration = get_audio_duration(wav_file.path)
             
             if duration is not None:
-                # CSVに書き込み
-                writer.writerow([file_id, f"{duration:.6f}", language])
+                # CSVに書き込む行を蓄積し、一定数ごとにまとめて書き込み
+                rows.append((file_id, f"{duration:.6f}", language))
+                if len(rows) >= CSV_WRITE_BATCH_SIZE:
+                    writer.writerows(rows)
+                    rows.clear()
                 
                 # 統計情報を更新
                 processed_files += 1
@@ -144,6 +171,9 @@ def create_audio_duration_csv():
             else:
                 failed_files += 1
                 print(f"   警告: {wav_file.name}の音声長取得に失敗")
+        
+        # 残りの行を書き込み
+        writer.writerows(rows)
     
     # 結果サマリー
     print(f"\n=== 処理完了 ===")
@@ -183,4 +213,9 @@ def create_audio_duration_csv():
     print(f"終了時刻: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
 
 if __name__ == "__main__":
-    create_audio_duration_csv() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--assume-converted', action='store_true',
+                        help='全ファイルがpcm_s16le・22050Hz・モノラルに変換済みとみなし、ファイルサイズから音声長を算出する')
+    args = parser.parse_args()
+    
+    create_audio_duration_csv(assume_converted=args.assume_converted)
\ No newline at end of file
@@ -3,69 +3,100 @@
 CSS10データセットの最終分析レポート生成スクリプト
 """
 
+import io
 import os
+import sys
+import csv
+import argparse
 import numpy as np
 from pathlib import Path
 from collections import defaultdict
 import struct
 from datetime import datetime
+from contextlib import redirect_stdout
+from concurrent.futures import ProcessPoolExecutor
+
+# soundfileのインポートを試行（利用できない場合は自前のヘッダー解析で音声長を算出）
+try:
+    import soundfile as sf
+    SOUNDFILE_AVAILABLE = True
+except ImportError:
+    SOUNDFILE_AVAILABLE = False
+
+# ヘッダー解析用に1回で読み込むバイト数（LIST/JUNKチャンクがあっても通常は収まる）
+HEADER_READ_SIZE = 4096
+
+# RIFFヘッダー・チャンクヘッダー・fmtチャンク本体の構造体
+_RIFF_HEADER = struct.Struct('<4sI4s')
+_CHUNK_HEADER = struct.Struct('<4sI')
+_FMT_FIELDS = struct.Struct('<HHIIHH')
+_FMT_KEYS = ('audio_format', 'num_channels', 'sample_rate', 'byte_rate', 'block_align', 'bits_per_sample')
+
+# プロセスプールに1回で渡すファイル数（プロセス間通信のオーバーヘッドを抑える）
+PROCESS_CHUNK_SIZE = 256
+
+# create_audio_duration_csv.pyが出力する音声長CSV（ファイル一覧と音声長のマニフェストとして再利用）
+DURATION_CSV = Path('raw/audio_durations.csv')
+
+def read_at(fd, size, offset):
+    """fdのoffset位置からsizeバイトを読み込み（os.preadがないOSではlseek + read）"""
+    if hasattr(os, 'pread'):
+        return os.pread(fd, size, offset)
+    os.lseek(fd, offset, os.SEEK_SET)
+    return os.read(fd, size)
 
 def read_wav_header(wav_file):
     """WAVファイルのヘッダー情報を読み込み"""
     try:
-        with open(wav_file, 'rb') as f:
-            riff = f.read(4)
-            if riff != b'RIFF':
+        fd = os.open(wav_file, os.O_RDONLY | getattr(os, 'O_BINARY', 0))
+        try:
+            # 先頭をまとめて1回だけ読み込み、チャンクはオフセットを進めてメモリ上で走査
+            buf = read_at(fd, HEADER_READ_SIZE, 0)
+            if len(buf) < _RIFF_HEADER.size:
                 return None
             
-            file_size = struct.unpack('<I', f.read(4))[0]
-            wave = f.read(4)
-            if wave != b'WAVE':
+            riff, file_size, wave = _RIFF_HEADER.unpack_from(buf)
+            if riff != b'RIFF' or wave != b'WAVE':
                 return None
             
-            while True:
-                chunk_id = f.read(4)
-                if not chunk_id:
+            fmt = None
+            data_size = None
+            offset = 12
+            base = 0
+            while fmt is None or data_size is None:
+                # チャンクヘッダーとfmt本体がバッファに収まらない場合のみ、その位置から読み直す
+                if offset + 8 + _FMT_FIELDS.size > base + len(buf):
+                    buf = read_at(fd, HEADER_READ_SIZE, offset)
+                    base = offset
+                
+                pos = offset - base
+                if pos + 8 > len(buf):
                     break
                 
-                chunk_size = struct.unpack('<I', f.read(4))[0]
+                chunk_id, chunk_size = _CHUNK_HEADER.unpack_from(buf, pos)
                 
                 if chunk_id == b'fmt ':
-                    audio_format = struct.unpack('<H', f.read(2))[0]
-                    num_channels = struct.unpack('<H', f.read(2))[0]
-                    sample_rate = struct.unpack('<I', f.read(4))[0]
-                    byte_rate = struct.unpack('<I', f.read(4))[0]
-                    block_align = struct.unpack('<H', f.read(2))[0]
-                    bits_per_sample = struct.unpack('<H', f.read(2))[0]
-                    
-                    return {
-                        'audio_format': audio_format,
-                        'num_channels': num_channels,
-                        'sample_rate': sample_rate,
-                        'byte_rate': byte_rate,
-                        'block_align': block_align,
-                        'bits_per_sample': bits_per_sample,
-                        'file_size': file_size
-                    }
+                    if pos + 8 + _FMT_FIELDS.size > len(buf):
+                        break
+                    fmt = dict(zip(_FMT_KEYS, _FMT_FIELDS.unpack_from(buf, pos + 8)))
+                    fmt['file_size'] = file_size
                 elif chunk_id == b'data':
-                    if 'sample_rate' in locals():
-                        duration = chunk_size / (sample_rate * num_channels * (bits_per_sample // 8))
-                        return {
-                            'audio_format': audio_format,
-                            'num_channels': num_channels,
-                            'sample_rate': sample_rate,
-                            'byte_rate': byte_rate,
-                            'block_align': block_align,
-                            'bits_per_sample': bits_per_sample,
-                            'file_size': file_size,
-                            'duration': duration
-                        }
-                    else:
-                        f.seek(chunk_size, 1)
-                else:
-                    f.seek(chunk_size, 1)
-            
+                    data_size = chunk_size
+                    # 音声データの開始位置（標準的なWAVでは44バイト）
+                    header_size = offset + 8
+                
+                offset += 8 + ((chunk_size + 1) & ~1)
+        finally:
+            os.close(fd)
+        
+        if fmt is None:
             return None
+        
+        bytes_per_second = fmt['sample_rate'] * fmt['num_channels'] * (fmt['bits_per_sample'] // 8)
+        if data_size is not None and bytes_per_second:
+            fmt['duration'] = data_size / bytes_per_second
+            fmt['header_size'] = header_size
+        return fmt
             
     except Exception as e:
         return None
@@ -73,20 +104,94 @@ def read_wav_header(wav_file):
 def get_audio_duration(wav_file):
     """WAVファイルの音声長を取得（秒）"""
     try:
+        # libsndfileはRF64や拡張fmtチャンクにも対応しているため、利用できる場合は優先
+        if SOUNDFILE_AVAILABLE:
+            info = sf.info(str(wav_file))
+            return info.frames / info.samplerate
+        
         header_info = read_wav_header(wav_file)
-        if header_info and 'duration' in header_info:
-            return header_info['duration']
-        else:
-            header_info = read_wav_header(wav_file)
-            if header_info:
-                data_size = header_info['file_size'] - 44
-                duration = data_size / header_info['byte_rate']
-                return duration
+        if not header_info:
             return None
+        if 'duration' in header_info:
+            return header_info['duration']
+        data_size = header_info['file_size'] - 44
+        return data_size / header_info['byte_rate']
     except Exception as e:
         return None
 
-def analyze_dataset():
+def fast_duration(file_size, byte_rate, block_align):
+    """標準の44バイトヘッダーを前提に、ファイルサイズだけから音声長を算出（不自然な値ならNone）"""
+    data_size = file_size - 44
+    if data_size <= 0 or data_size % block_align:
+        return None
+    return data_size / byte_rate
+
+def load_duration_manifest(csv_path, wavs_dir):
+    """音声長CSVがWAVディレクトリより新しければ、(ファイル一覧, 音声長配列)を読み込み（古い・存在しない場合はNone）"""
+    try:
+        # ファイルの追加・削除・置き換えがあるとディレクトリの更新時刻が変わるため、CSV作成後の変更を検出できる
+        if csv_path.stat().st_mtime < wavs_dir.stat().st_mtime:
+            return None
+    except OSError:
+        return None
+    
+    with open(csv_path, 'r', encoding='utf-8', newline='') as f:
+        reader = csv.reader(f)
+        next(reader, None)  # ヘッダーをスキップ
+        rows = [row for row in reader if len(row) >= 2]
+    
+    if not rows:
+        return None
+    
+    wav_files = [wavs_dir / f"{row[0]}.wav" for row in rows]
+    durations = np.array([row[1] for row in rows], dtype=np.float32)
+    return wav_files, durations
+
+def compute_durations(wav_entries, wav_files):
+    """全WAVファイルの音声長を配列で取得（取得できなかったファイルはNaN）"""
+    # CSS10は言語ごとにフォーマットが統一されているため、言語ごとに1ファイルだけヘッダーを解析
+    lang_formats = {}
+    for wav_file in wav_files:
+        lang_code = wav_file.name[:2]
+        if lang_code not in lang_formats:
+            header_info = read_wav_header(wav_file)
+            if (header_info and header_info.get('header_size') == 44
+                    and header_info['byte_rate'] and header_info['block_align']):
+                lang_formats[lang_code] = header_info
+            else:
+                lang_formats[lang_code] = None
+    
+    # 標準ヘッダーの言語はファイルサイズ（stat）のみから算出し、それ以外はヘッダーを解析
+    # 音声長はPythonのリストに溜めず、事前確保したfloat32配列に直接書き込む（取得できなかったファイルはNaN）
+    # 数百秒以下の音声長ならfloat32でもミリ秒未満の精度があり、統計処理のメモリ帯域を半分にできる
+    all_durations = np.full(len(wav_files), np.nan, dtype=np.float32)
+    parse_indices = []
+    for i, wav_file in enumerate(wav_files):
+        if i % 10000 == 0:
+            print(f"   進捗: {i:,}/{len(wav_files):,}")
+        
+        header_info = lang_formats[wav_file.name[:2]]
+        duration = None
+        if header_info:
+            file_size = wav_entries[i].stat().st_size
+            duration = fast_duration(file_size, header_info['byte_rate'], header_info['block_align'])
+        if duration is None:
+            parse_indices.append(i)
+        else:
+            all_durations[i] = duration
+    
+    # ヘッダー解析が必要なファイルはプロセスプールで並列に実行（結果は入力順）
+    if parse_indices:
+        with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+            results = executor.map(get_audio_duration, [wav_files[i] for i in parse_indices],
+                                   chunksize=PROCESS_CHUNK_SIZE)
+            for i, duration in zip(parse_indices, results):
+                if duration is not None:
+                    all_durations[i] = duration
+    
+    return all_durations
+
+def analyze_dataset(rescan=False):
     """データセットの詳細分析"""
     print("=" * 80)
     print("CSS10データセット 最終分析レポート")
@@ -95,7 +200,15 @@ def analyze_dataset():
     print()
     
     wavs_dir = Path('raw/wavs')
-    wav_files = list(wavs_dir.glob('*.wav'))
+    # create_audio_duration_csv.pyの出力がWAVディレクトリより新しければ、一覧と音声長をそこから再利用
+    manifest = None if rescan else load_duration_manifest(DURATION_CSV, wavs_dir)
+    if manifest:
+        wav_files, all_durations = manifest
+    else:
+        # os.scandirで一覧とファイルサイズを1回の走査で取得
+        with os.scandir(wavs_dir) as entries:
+            wav_entries = [entry for entry in entries if entry.name.endswith('.wav')]
+        wav_files = [Path(entry.path) for entry in wav_entries]
     
     if not wav_files:
         print("WAVファイルが見つかりません")
@@ -104,11 +217,9 @@ def analyze_dataset():
     print(f"📁 データセット概要")
     print(f"   総ファイル数: {len(wav_files):,}ファイル")
     
-    # 言語別ファイル数
-    lang_counts = defaultdict(int)
-    for wav_file in wav_files:
-        lang_code = wav_file.stem.split('_')[0]
-        lang_counts[lang_code] += 1
+    # 言語別ファイル数（言語を整数コード化し、bincountで一括集計）
+    lang_count_names, lang_count_codes = np.unique([wav_file.name[:2] for wav_file in wav_files], return_inverse=True)
+    lang_counts = dict(zip(lang_count_names.tolist(), np.bincount(lang_count_codes).tolist()))
     
     print(f"\n🌍 言語別ファイル数:")
     total_files = 0
@@ -139,153 +250,162 @@ def analyze_dataset():
     
     # 音声長分析
     print(f"\n⏱️ 音声長分析中...")
-    durations = []
-    lang_durations = defaultdict(list)
     
-    for i, wav_file in enumerate(wav_files):
-        if i % 10000 == 0:
-            print(f"   進捗: {i:,}/{len(wav_files):,}")
-        
-        duration = get_audio_duration(wav_file)
-        if duration is not None:
-            durations.append(duration)
-            lang_code = wav_file.stem.split('_')[0]
-            lang_durations[lang_code].append(duration)
+    if manifest:
+        print(f"   {DURATION_CSV} の音声長を使用")
+    else:
+        all_durations = compute_durations(wav_entries, wav_files)
     
-    if not durations:
+    # 取得に成功したファイルのみを連続した配列にまとめる
+    valid_indices = np.flatnonzero(~np.isnan(all_durations))
+    if not len(valid_indices):
         print("有効な音声ファイルが見つかりませんでした")
         return
     
-    durations = np.array(durations)
-    
-    print(f"\n📊 音声長統計")
-    print(f"   有効ファイル数: {len(durations):,}ファイル")
-    print(f"   失敗ファイル数: {len(wav_files) - len(durations):,}ファイル")
-    
-    # 基本統計
-    min_duration = np.min(durations)
-    max_duration = np.max(durations)
-    mean_duration = np.mean(durations)
-    median_duration = np.median(durations)
-    std_duration = np.std(durations)
-    
-    print(f"\n   基本統計:")
-    print(f"     最小音声長: {min_duration:.3f}秒")
-    print(f"     最大音声長: {max_duration:.3f}秒")
-    print(f"     平均音声長: {mean_duration:.3f}秒")
-    print(f"     中央値: {median_duration:.3f}秒")
-    print(f"     標準偏差: {std_duration:.3f}秒")
-    
-    # 中央値から80%の範囲
-    sorted_durations = np.sort(durations)
-    total_files = len(sorted_durations)
-    start_idx = int(total_files * 0.1)
-    end_idx = int(total_files * 0.9)
-    
-    range_80_min = sorted_durations[start_idx]
-    range_80_max = sorted_durations[end_idx]
-    
-    print(f"\n   中央値から80%の範囲（上位・下位10%を除く）:")
-    print(f"     最小値: {range_80_min:.3f}秒")
-    print(f"     最大値: {range_80_max:.3f}秒")
-    print(f"     範囲幅: {range_80_max - range_80_min:.3f}秒")
-    
-    # 言語別統計
-    print(f"\n🌍 言語別音声長統計:")
-    for lang_code in sorted(lang_durations.keys()):
-        lang_durs = np.array(lang_durations[lang_code])
-        print(f"\n   {lang_code}:")
-        print(f"     ファイル数: {len(lang_durs):,}")
-        print(f"     最小: {np.min(lang_durs):.3f}秒")
-        print(f"     最大: {np.max(lang_durs):.3f}秒")
-        print(f"     平均: {np.mean(lang_durs):.3f}秒")
-        print(f"     中央値: {np.median(lang_durs):.3f}秒")
-        print(f"     標準偏差: {np.std(lang_durs):.3f}秒")
-    
-    # 極値ファイルの特定
-    print(f"\n🎯 極値ファイル:")
-    min_file = None
-    max_file = None
-    
-    for wav_file in wav_files:
-        duration = get_audio_duration(wav_file)
-        if duration is not None:
-            if abs(duration - min_duration) < 0.001:
-                min_file = wav_file
-            if abs(duration - max_duration) < 0.001:
-                max_file = wav_file
-    
-    if min_file:
-        print(f"   最短ファイル: {min_file.name}")
-        print(f"     音声長: {min_duration:.3f}秒")
-        print(f"     言語: {min_file.stem.split('_')[0]}")
-    
-    if max_file:
-        print(f"   最長ファイル: {max_file.name}")
-        print(f"     音声長: {max_duration:.3f}秒")
-        print(f"     言語: {max_file.stem.split('_')[0]}")
-    
-    # データセット品質評価
-    print(f"\n✅ データセット品質評価:")
-    
-    # 音声長の一貫性
-    duration_range = max_duration - min_duration
-    if duration_range < 10:
-        consistency = "優秀"
-    elif duration_range < 20:
-        consistency = "良好"
-    elif duration_range < 30:
-        consistency = "普通"
-    else:
-        consistency = "要改善"
-    
-    print(f"   音声長の一貫性: {consistency} (範囲: {duration_range:.1f}秒)")
-    
-    # 中央値からのばらつき
-    median_deviation = np.mean(np.abs(durations - median_duration))
-    if median_deviation < 2:
-        uniformity = "優秀"
-    elif median_deviation < 3:
-        uniformity = "良好"
-    elif median_deviation < 4:
-        uniformity = "普通"
-    else:
-        uniformity = "要改善"
-    
-    print(f"   中央値からのばらつき: {uniformity} (平均偏差: {median_deviation:.2f}秒)")
-    
-    # 言語間の一貫性
-    lang_means = [np.mean(lang_durations[lang]) for lang in sorted(lang_durations.keys())]
-    lang_std = np.std(lang_means)
-    if lang_std < 0.5:
-        cross_lang_consistency = "優秀"
-    elif lang_std < 1.0:
-        cross_lang_consistency = "良好"
-    elif lang_std < 1.5:
-        cross_lang_consistency = "普通"
-    else:
-        cross_lang_consistency = "要改善"
-    
-    print(f"   言語間の一貫性: {cross_lang_consistency} (標準偏差: {lang_std:.3f}秒)")
-    
-    # 推奨事項
-    print(f"\n💡 推奨事項:")
-    print(f"   1. 音声長の範囲: {range_80_min:.1f}秒～{range_80_max:.1f}秒が推奨範囲")
-    print(f"   2. 平均音声長: {mean_duration:.1f}秒が標準的な長さ")
-    print(f"   3. 極端に短い音声（{min_duration:.1f}秒未満）や長い音声（{max_duration:.1f}秒超）は要検討")
-    print(f"   4. 言語間で音声長の一貫性が保たれているため、多言語学習に適している")
-    
-    # 機械学習への適用性
-    print(f"\n🤖 機械学習への適用性:")
-    print(f"   ✅ IEEE浮動小数点フォーマット（32bit）により高精度な音声データ")
-    print(f"   ✅ 統一されたサンプルレート（22050Hz）で処理が容易")
-    print(f"   ✅ モノラル形式でメモリ効率が良い")
-    print(f"   ✅ 言語間で一貫した音声長分布")
-    print(f"   ✅ 十分なデータ量（{len(durations):,}ファイル）")
+    durations = all_durations[valid_indices]
+    
+    # 言語別に分類（言語を整数コード化し、コード順に並べた配列のスライスとして保持）
+    lang_names, lang_codes = np.unique([wav_files[i].name[:2] for i in valid_indices], return_inverse=True)
+    lang_sizes = np.bincount(lang_codes)
+    lang_means = np.bincount(lang_codes, weights=durations) / lang_sizes
+    lang_order = np.argsort(lang_codes, kind='stable')
+    lang_sorted_durations = durations[lang_order]
+    lang_starts = np.concatenate(([0], np.cumsum(lang_sizes)[:-1]))
+    lang_mins = np.minimum.reduceat(lang_sorted_durations, lang_starts)
+    lang_maxs = np.maximum.reduceat(lang_sorted_durations, lang_starts)
+    lang_durations = {
+        lang_code: lang_sorted_durations[start:start + count]
+        for lang_code, start, count in zip(lang_names, lang_starts, lang_sizes)
+    }
     
-    print(f"\n" + "=" * 80)
-    print("分析完了")
-    print("=" * 80)
+    # 統計の出力は数百行になるため、メモリ上にまとめてから1回で書き出す
+    with redirect_stdout(io.StringIO()) as report:
+        print(f"\n📊 音声長統計")
+        print(f"   有効ファイル数: {len(durations):,}ファイル")
+        print(f"   失敗ファイル数: {len(wav_files) - len(durations):,}ファイル")
+        
+        # 基本統計
+        # 極値はargmin/argmaxの1回ずつで値とファイルの位置を同時に求める
+        min_idx = int(np.argmin(durations))
+        max_idx = int(np.argmax(durations))
+        min_duration = durations[min_idx]
+        max_duration = durations[max_idx]
+        mean_duration = np.mean(durations)
+        median_duration = np.median(durations)
+        std_duration = np.std(durations)
+        
+        print(f"\n   基本統計:")
+        print(f"     最小音声長: {min_duration:.3f}秒")
+        print(f"     最大音声長: {max_duration:.3f}秒")
+        print(f"     平均音声長: {mean_duration:.3f}秒")
+        print(f"     中央値: {median_duration:.3f}秒")
+        print(f"     標準偏差: {std_duration:.3f}秒")
+        
+        # 中央値から80%の範囲（全体をソートせず、必要な2つの順位だけを選択）
+        total_files = len(durations)
+        start_idx = int(total_files * 0.1)
+        end_idx = int(total_files * 0.9)
+        
+        partitioned = np.partition(durations, [start_idx, end_idx])
+        range_80_min = partitioned[start_idx]
+        range_80_max = partitioned[end_idx]
+        
+        print(f"\n   中央値から80%の範囲（上位・下位10%を除く）:")
+        print(f"     最小値: {range_80_min:.3f}秒")
+        print(f"     最大値: {range_80_max:.3f}秒")
+        print(f"     範囲幅: {range_80_max - range_80_min:.3f}秒")
+        
+        # 言語別統計
+        print(f"\n🌍 言語別音声長統計:")
+        for i, lang_code in enumerate(lang_names):
+            lang_durs = lang_durations[lang_code]
+            print(f"\n   {lang_code}:")
+            print(f"     ファイル数: {lang_sizes[i]:,}")
+            print(f"     最小: {lang_mins[i]:.3f}秒")
+            print(f"     最大: {lang_maxs[i]:.3f}秒")
+            print(f"     平均: {lang_means[i]:.3f}秒")
+            print(f"     中央値: {np.median(lang_durs):.3f}秒")
+            print(f"     標準偏差: {np.std(lang_durs):.3f}秒")
+        
+        # 極値ファイルの特定（1回目の走査結果から取得）
+        print(f"\n🎯 極値ファイル:")
+        min_file = wav_files[valid_indices[min_idx]]
+        max_file = wav_files[valid_indices[max_idx]]
+        
+        if min_file:
+            print(f"   最短ファイル: {min_file.name}")
+            print(f"     音声長: {min_duration:.3f}秒")
+            print(f"     言語: {min_file.name[:2]}")
+        
+        if max_file:
+            print(f"   最長ファイル: {max_file.name}")
+            print(f"     音声長: {max_duration:.3f}秒")
+            print(f"     言語: {max_file.name[:2]}")
+        
+        # データセット品質評価
+        print(f"\n✅ データセット品質評価:")
+        
+        # 音声長の一貫性
+        duration_range = max_duration - min_duration
+        if duration_range < 10:
+            consistency = "優秀"
+        elif duration_range < 20:
+            consistency = "良好"
+        elif duration_range < 30:
+            consistency = "普通"
+        else:
+            consistency = "要改善"
+        
+        print(f"   音声長の一貫性: {consistency} (範囲: {duration_range:.1f}秒)")
+        
+        # 中央値からのばらつき
+        # 一時配列を1つだけ確保し、差分と絶対値はその場で計算
+        deviations = np.subtract(durations, median_duration)
+        np.abs(deviations, out=deviations)
+        median_deviation = deviations.mean()
+        if median_deviation < 2:
+            uniformity = "優秀"
+        elif median_deviation < 3:
+            uniformity = "良好"
+        elif median_deviation < 4:
+            uniformity = "普通"
+        else:
+            uniformity = "要改善"
+        
+        print(f"   中央値からのばらつき: {uniformity} (平均偏差: {median_deviation:.2f}秒)")
+        
+        # 言語間の一貫性
+        lang_std = np.std(lang_means)
+        if lang_std < 0.5:
+            cross_lang_consistency = "優秀"
+        elif lang_std < 1.0:
+            cross_lang_consistency = "良好"
+        elif lang_std < 1.5:
+            cross_lang_consistency = "普通"
+        else:
+            cross_lang_consistency = "要改善"
+        
+        print(f"   言語間の一貫性: {cross_lang_consistency} (標準偏差: {lang_std:.3f}秒)")
+        
+        # 推奨事項
+        print(f"\n💡 推奨事項:")
+        print(f"   1. 音声長の範囲: {range_80_min:.1f}秒～{range_80_max:.1f}秒が推奨範囲")
+        print(f"   2. 平均音声長: {mean_duration:.1f}秒が標準的な長さ")
+        print(f"   3. 極端に短い音声（{min_duration:.1f}秒未満）や長い音声（{max_duration:.1f}秒超）は要検討")
+        print(f"   4. 言語間で音声長の一貫性が保たれているため、多言語学習に適している")
+        
+        # 機械学習への適用性
+        print(f"\n🤖 機械学習への適用性:")
+        print(f"   ✅ IEEE浮動小数点フォーマット（32bit）により高精度な音声データ")
+        print(f"   ✅ 統一されたサンプルレート（22050Hz）で処理が容易")
+        print(f"   ✅ モノラル形式でメモリ効率が良い")
+        print(f"   ✅ 言語間で一貫した音声長分布")
+        print(f"   ✅ 十分なデータ量（{len(durations):,}ファイル）")
+        
+        print(f"\n" + "=" * 80)
+        print("分析完了")
+        print("=" * 80)
+    sys.stdout.write(report.getvalue())
     
     return {
         'total_files': len(wav_files),
@@ -295,8 +415,12 @@ def analyze_dataset():
         'max_duration': max_duration,
         'mean_duration': mean_duration,
         'median_duration': median_duration,
-        'lang_durations': dict(lang_durations)
+        'lang_durations': lang_durations
     }
 
 if __name__ == "__main__":
-    analyze_dataset() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rescan', action='store_true',
+                        help='音声長CSVを使わず、WAVファイルを走査して音声長を算出する')
+    args = parser.parse_args()
+    analyze_dataset(rescan=args.rescan) 
\ No newline at end of file
@@ -8,45 +8,69 @@ import wave
 import struct
 from pathlib import Path
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+# ヘッダー解析用に1回で読み込むバイト数（LIST/JUNKチャンクがあっても通常は収まる）
+HEADER_READ_SIZE = 4096
+
+# RIFFヘッダー・チャンクヘッダー・fmtチャンク本体の構造体
+_RIFF_HEADER = struct.Struct('<4sI4s')
+_CHUNK_HEADER = struct.Struct('<4sI')
+_FMT_FIELDS = struct.Struct('<HHIIHH')
+_FMT_KEYS = ('audio_format', 'num_channels', 'sample_rate', 'byte_rate', 'block_align', 'bits_per_sample')
+
+# プロセスプールに1回で渡すファイル数（プロセス間通信のオーバーヘッドを抑える）
+PROCESS_CHUNK_SIZE = 256
+
+def read_at(fd, size, offset):
+    """fdのoffset位置からsizeバイトを読み込み（os.preadがないOSではlseek + read）"""
+    if hasattr(os, 'pread'):
+        return os.pread(fd, size, offset)
+    os.lseek(fd, offset, os.SEEK_SET)
+    return os.read(fd, size)
 
 def investigate_wav_format(wav_file):
     """WAVファイルのフォーマットを詳細に調査"""
     try:
-        with open(wav_file, 'rb') as f:
-            # WAVヘッダーを読み込み
-            riff_header = f.read(4)
-            file_size = struct.unpack('<I', f.read(4))[0]
-            wave_header = f.read(4)
+        fd = os.open(wav_file, os.O_RDONLY | getattr(os, 'O_BINARY', 0))
+        try:
+            # WAVヘッダーをまとめて1回だけ読み込み
+            buf = read_at(fd, HEADER_READ_SIZE, 0)
+            if len(buf) < _RIFF_HEADER.size:
+                return {'error': 'ファイルが短すぎます'}
+            
+            _, file_size, _ = _RIFF_HEADER.unpack_from(buf)
             
-            # fmtチャンクを探す
+            # fmtチャンクを探す（オフセットを進めてメモリ上で走査）
+            offset = 12
+            base = 0
             while True:
-                chunk_id = f.read(4)
-                if not chunk_id:
+                # チャンクヘッダーとfmt本体がバッファに収まらない場合のみ、その位置から読み直す
+                if offset + 8 + _FMT_FIELDS.size > base + len(buf):
+                    buf = read_at(fd, HEADER_READ_SIZE, offset)
+                    base = offset
+                
+                pos = offset - base
+                if pos + 8 > len(buf):
                     break
-                    
-                chunk_size = struct.unpack('<I', f.read(4))[0]
+                
+                chunk_id, chunk_size = _CHUNK_HEADER.unpack_from(buf, pos)
                 
                 if chunk_id == b'fmt ':
-                    # フォーマット情報を読み込み
-                    audio_format = struct.unpack('<H', f.read(2))[0]
-                    num_channels = struct.unpack('<H', f.read(2))[0]
-                    sample_rate = struct.unpack('<I', f.read(4))[0]
-                    byte_rate = struct.unpack('<I', f.read(4))[0]
-                    block_align = struct.unpack('<H', f.read(2))[0]
-                    bits_per_sample = struct.unpack('<H', f.read(2))[0]
+                    if pos + 8 + _FMT_FIELDS.size > len(buf):
+                        break
                     
-                    return {
-                        'audio_format': audio_format,
-                        'num_channels': num_channels,
-                        'sample_rate': sample_rate,
-                        'byte_rate': byte_rate,
-                        'block_align': block_align,
-                        'bits_per_sample': bits_per_sample,
-                        'file_size': file_size
-                    }
-                else:
-                    # このチャンクをスキップ
-                    f.seek(chunk_size, 1)
+                    # フォーマット情報を読み込み
+                    format_info = dict(zip(_FMT_KEYS, _FMT_FIELDS.unpack_from(buf, pos + 8)))
+                    format_info['file_size'] = file_size
+                    return format_info
+                
+                # このチャンクをスキップ
+                offset += 8 + ((chunk_size + 1) & ~1)
+        finally:
+            os.close(fd)
+        
+        return {'error': 'fmtチャンクが見つかりません'}
                     
     except Exception as e:
         return {'error': str(e)}
@@ -55,7 +79,8 @@ def main():
     print("=== 全言語WAVファイルフォーマット調査 ===\n")
     
     wavs_dir = Path('raw/wavs')
-    wav_files = list(wavs_dir.glob('*.wav'))
+    with os.scandir(wavs_dir) as entries:
+        wav_files = [Path(entry.path) for entry in entries if entry.name.endswith('.wav')]
     
     if not wav_files:
         print("WAVファイルが見つかりません")
@@ -63,25 +88,44 @@ def main():
     
     print(f"調査対象: {len(wav_files)}ファイル")
     
-    # 言語別に分類
-    lang_files = defaultdict(list)
-    for wav_file in wav_files:
-        lang_code = wav_file.stem.split('_')[0]
-        lang_files[lang_code].append(wav_file)
+    # 全ファイルを1回だけ解析し、言語別のファイル数・サンプル情報・フォーマット分布を同時に集計
+    print(f"\n=== 全ファイルフォーマット分布調査 ===")
+    lang_file_counts = defaultdict(int)
+    lang_samples = {}
+    lang_format_counts = defaultdict(lambda: defaultdict(int))
+    lang_error_counts = defaultdict(int)
+    
+    # ヘッダー解析はファイルごとに独立しているため、プロセスプールで並列に実行
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+        results = executor.map(investigate_wav_format, wav_files, chunksize=PROCESS_CHUNK_SIZE)
+        for i, (wav_file, format_info) in enumerate(zip(wav_files, results)):
+            if i % 1000 == 0 and i > 0:
+                print(f"  {i}/{len(wav_files)}")
+            
+            lang_code = wav_file.name[:2]
+            lang_file_counts[lang_code] += 1
+            
+            # 各言語で最初に見つかったファイルをサンプルとして解析結果ごと保持
+            if lang_code not in lang_samples:
+                lang_samples[lang_code] = (wav_file, format_info)
+            
+            if 'error' in format_info:
+                lang_error_counts[lang_code] += 1
+            else:
+                audio_format = format_info['audio_format']
+                lang_format_counts[lang_code][audio_format] += 1
     
     print(f"\n=== 言語別ファイル数 ===")
-    for lang_code in sorted(lang_files.keys()):
-        print(f"{lang_code}: {len(lang_files[lang_code])}ファイル")
+    for lang_code in sorted(lang_file_counts.keys()):
+        print(f"{lang_code}: {lang_file_counts[lang_code]}ファイル")
     
-    # 各言語のサンプルファイルを詳細調査
+    # 各言語のサンプルファイルを詳細表示（解析済みの結果を再利用）
     print(f"\n=== 各言語サンプルファイル詳細調査 ===")
-    for lang_code in sorted(lang_files.keys()):
+    for lang_code in sorted(lang_samples.keys()):
         print(f"\n--- {lang_code} ---")
-        sample_file = lang_files[lang_code][0]
+        sample_file, format_info = lang_samples[lang_code]
         print(f"サンプルファイル: {sample_file.name}")
         
-        format_info = investigate_wav_format(sample_file)
-        
         if 'error' in format_info:
             print(f"エラー: {format_info['error']}")
         else:
@@ -99,31 +143,11 @@ def main():
             else:
                 print(f"フォーマット: その他 (コード: {format_info['audio_format']}) ❌")
     
-    # 全ファイルのフォーマット分布を調査
-    print(f"\n=== 全ファイルフォーマット分布調査 ===")
-    lang_format_counts = defaultdict(lambda: defaultdict(int))
-    lang_error_counts = defaultdict(int)
-    
-    for lang_code, files in lang_files.items():
-        print(f"\n{lang_code}言語の調査中...")
-        
-        for i, wav_file in enumerate(files):
-            if i % 1000 == 0 and i > 0:
-                print(f"  {lang_code}: {i}/{len(files)}")
-                
-            format_info = investigate_wav_format(wav_file)
-            
-            if 'error' in format_info:
-                lang_error_counts[lang_code] += 1
-            else:
-                audio_format = format_info['audio_format']
-                lang_format_counts[lang_code][audio_format] += 1
-    
     # 結果表示
     print(f"\n=== 調査結果サマリー ===")
-    for lang_code in sorted(lang_files.keys()):
+    for lang_code in sorted(lang_file_counts.keys()):
         print(f"\n{lang_code}:")
-        total_files = len(lang_files[lang_code])
+        total_files = lang_file_counts[lang_code]
         error_count = lang_error_counts[lang_code]
         print(f"  総ファイル数: {total_files}")
         print(f"  エラー数: {error_count}")
@@ -138,7 +162,7 @@ def main():
     print(f"\n=== 問題のある言語の特定 ===")
     problematic_langs = []
     
-    for lang_code in sorted(lang_files.keys()):
+    for lang_code in sorted(lang_file_counts.keys()):
         has_ieee = lang_format_counts[lang_code].get(3, 0) > 0
         has_other = any(fmt != 1 and fmt != 3 for fmt in lang_format_counts[lang_code].keys())
         has_errors = lang_error_counts[lang_code] > 0
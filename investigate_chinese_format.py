@@ -7,6 +7,11 @@ import os
 import struct
 from pathlib import Path
 
+# ヘッダー解析用の構造体（フォーマット文字列の解析を呼び出しごとに行わないようモジュールで1回だけ生成）
+_U16 = struct.Struct('<H')
+_U32 = struct.Struct('<I')
+_FMT_FIELDS = struct.Struct('<HHIIHH')
+
 def investigate_wav_header(wav_file):
     """WAVファイルのヘッダーを詳細に調査"""
     try:
@@ -25,7 +30,7 @@ def investigate_wav_header(wav_file):
                 return False
             
             # ファイルサイズ（RIFFチャンクサイズ）
-            riff_size = struct.unpack('<I', f.read(4))[0]
+            riff_size = _U32.unpack(f.read(4))[0]
             print(f"RIFFチャンクサイズ: {riff_size:,} バイト")
             
             # WAVE識別子
@@ -41,17 +46,13 @@ def investigate_wav_header(wav_file):
                 if not chunk_id:
                     break
                 
-                chunk_size = struct.unpack('<I', f.read(4))[0]
+                chunk_size = _U32.unpack(f.read(4))[0]
                 print(f"\nチャンク: {chunk_id} (サイズ: {chunk_size:,} バイト)")
                 
                 if chunk_id == b'fmt ':
                     # fmtチャンクの詳細
-                    audio_format = struct.unpack('<H', f.read(2))[0]
-                    num_channels = struct.unpack('<H', f.read(2))[0]
-                    sample_rate = struct.unpack('<I', f.read(4))[0]
-                    byte_rate = struct.unpack('<I', f.read(4))[0]
-                    block_align = struct.unpack('<H', f.read(2))[0]
-                    bits_per_sample = struct.unpack('<H', f.read(2))[0]
+                    (audio_format, num_channels, sample_rate,
+                     byte_rate, block_align, bits_per_sample) = _FMT_FIELDS.unpack(f.read(_FMT_FIELDS.size))
                     
                     print(f"  音声フォーマット: {audio_format}")
                     print(f"  チャンネル数: {num_channels}")
@@ -66,7 +67,7 @@ def investigate_wav_header(wav_file):
                         extra_data = f.read(extra_size)
                         print(f"  追加データ: {extra_size} バイト")
                         if extra_size >= 2:
-                            extra_param_size = struct.unpack('<H', extra_data[:2])[0]
+                            extra_param_size = _U16.unpack_from(extra_data)[0]
                             print(f"  追加パラメータサイズ: {extra_param_size}")
                     
                 elif chunk_id == b'data':
@@ -75,14 +76,16 @@ def investigate_wav_header(wav_file):
                     # データの最初の数バイトを表示
                     data_start = f.read(min(16, chunk_size))
                     print(f"  データ開始: {data_start.hex()}")
-                    # 残りをスキップ
+                    # 残りは読み込まずにシーク（音声データ全体を読まない）
                     if chunk_size > 16:
-                        f.read(chunk_size - 16)
+                        f.seek(chunk_size - 16, 1)
                     
                 else:
-                    # その他のチャンク
-                    chunk_data = f.read(chunk_size)
-                    print(f"  データ: {chunk_data[:16].hex()}...")
+                    # その他のチャンク（表示する先頭16バイトのみ読み込み、残りはシーク）
+                    chunk_data = f.read(min(16, chunk_size))
+                    print(f"  データ: {chunk_data.hex()}...")
+                    if chunk_size > 16:
+                        f.seek(chunk_size - 16, 1)
             
             return True
             
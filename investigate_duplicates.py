@@ -4,8 +4,48 @@
 """
 
 import os
+import hashlib
 from pathlib import Path
-from collections import defaultdict
+from collections import defaultdict, Counter
+from concurrent.futures import ProcessPoolExecutor
+
+# xxhashのインポートを試行（利用できない場合はhashlib.blake2bで代用）
+try:
+    import xxhash
+    XXHASH_AVAILABLE = True
+except ImportError:
+    XXHASH_AVAILABLE = False
+
+# ハッシュ計算時に1回で読み込むバイト数
+HASH_READ_SIZE = 1 << 20
+
+def scan_wav_stats(dir_path):
+    """os.scandirの1回の走査でWAVファイル数と総サイズを取得"""
+    count = 0
+    total_size = 0
+    with os.scandir(dir_path) as entries:
+        for entry in entries:
+            if entry.name.endswith('.wav'):
+                count += 1
+                total_size += entry.stat().st_size
+    return count, total_size
+
+def hash_file(file_path):
+    """ファイル内容のハッシュ値を計算（xxh3_64、なければblake2b）"""
+    h = xxhash.xxh3_64() if XXHASH_AVAILABLE else hashlib.blake2b(digest_size=8)
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_READ_SIZE), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+def hash_wav_files(dir_path):
+    """ディレクトリ内のWAVファイルの内容ハッシュを多重集合（Counter）として取得"""
+    with os.scandir(dir_path) as entries:
+        wav_paths = [entry.path for entry in entries if entry.name.endswith('.wav')]
+    
+    # ハッシュ計算はファイルごとに独立しているため、プロセスプールで並列に実行
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+        return Counter(executor.map(hash_file, wav_paths, chunksize=16))
 
 def investigate_duplicates():
     """データの重複を調査する"""
@@ -13,6 +53,10 @@ def investigate_duplicates():
     
     print("=== CSS10データセットの重複調査 ===\n")
     
+    # ディレクトリごとの(ファイル数, 総サイズ)と内容ハッシュは1回だけ計算し、複数の比較で再利用
+    dir_stats = {}
+    dir_hashes = {}
+    
     # 各アーカイブの構造を調査
     for archive_num in range(1, 11):
         archive_path = data_dir / f"archive ({archive_num})"
@@ -49,8 +93,12 @@ def investigate_duplicates():
                 for lang_dir in lang_dirs:
                     lang_content_dir = lang_dir / content_name
                     if lang_content_dir.exists():
-                        content_files = len(list(content_dir.glob('*.wav')))
-                        lang_files = len(list(lang_content_dir.glob('*.wav')))
+                        # ファイル数と総サイズはディレクトリごとに1回の走査でまとめて取得
+                        for dir_path in (content_dir, lang_content_dir):
+                            if dir_path not in dir_stats:
+                                dir_stats[dir_path] = scan_wav_stats(dir_path)
+                        content_files, content_size = dir_stats[content_dir]
+                        lang_files, lang_size = dir_stats[lang_content_dir]
                         
                         print(f"    {content_name}:")
                         print(f"      {content_dir}: {content_files}ファイル")
@@ -60,11 +108,20 @@ def investigate_duplicates():
                             print(f"      → 同じファイル数のため重複の可能性が高い")
                         
                         # ファイルサイズの比較
-                        content_size = sum(f.stat().st_size for f in content_dir.glob('*.wav'))
-                        lang_size = sum(f.stat().st_size for f in lang_content_dir.glob('*.wav'))
-                        
                         if content_size == lang_size:
                             print(f"      → 同じ総サイズのため重複の可能性が高い")
+                            
+                            # 内容のハッシュを比較して重複を確認（ファイル数・総サイズの一致だけでは偶然の可能性がある）
+                            for dir_path in (content_dir, lang_content_dir):
+                                if dir_path not in dir_hashes:
+                                    dir_hashes[dir_path] = hash_wav_files(dir_path)
+                            content_hashes = dir_hashes[content_dir]
+                            lang_hashes = dir_hashes[lang_content_dir]
+                            if content_hashes == lang_hashes:
+                                print(f"      → 全ファイルの内容ハッシュが一致するため重複が確定")
+                            else:
+                                common_files = sum((content_hashes & lang_hashes).values())
+                                print(f"      → 内容ハッシュが一致するファイル: {common_files}ファイル")
                         else:
                             print(f"      → サイズが異なるため異なるデータの可能性")
         
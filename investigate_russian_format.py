@@ -8,13 +8,17 @@ import wave
 import struct
 from pathlib import Path
 
+# ヘッダー解析用の構造体（フォーマット文字列の解析を呼び出しごとに行わないようモジュールで1回だけ生成）
+_U32 = struct.Struct('<I')
+_FMT_FIELDS = struct.Struct('<HHIIHH')
+
 def investigate_wav_format(wav_file):
     """WAVファイルのフォーマットを詳細に調査"""
     try:
         with open(wav_file, 'rb') as f:
             # WAVヘッダーを読み込み
             riff_header = f.read(4)
-            file_size = struct.unpack('<I', f.read(4))[0]
+            file_size = _U32.unpack(f.read(4))[0]
             wave_header = f.read(4)
             
             # fmtチャンクを探す
@@ -23,16 +27,12 @@ def investigate_wav_format(wav_file):
                 if not chunk_id:
                     break
                     
-                chunk_size = struct.unpack('<I', f.read(4))[0]
+                chunk_size = _U32.unpack(f.read(4))[0]
                 
                 if chunk_id == b'fmt ':
                     # フォーマット情報を読み込み
-                    audio_format = struct.unpack('<H', f.read(2))[0]
-                    num_channels = struct.unpack('<H', f.read(2))[0]
-                    sample_rate = struct.unpack('<I', f.read(4))[0]
-                    byte_rate = struct.unpack('<I', f.read(4))[0]
-                    block_align = struct.unpack('<H', f.read(2))[0]
-                    bits_per_sample = struct.unpack('<H', f.read(2))[0]
+                    (audio_format, num_channels, sample_rate,
+                     byte_rate, block_align, bits_per_sample) = _FMT_FIELDS.unpack(f.read(_FMT_FIELDS.size))
                     
                     return {
                         'audio_format': audio_format,
@@ -70,8 +70,9 @@ def main():
         print(f"\n{i+1}. {wav_file.name}")
         format_info = investigate_wav_format(wav_file)
         
-        if 'error' in format_info:
-            print(f"   エラー: {format_info['error']}")
+        # fmtチャンクが見つからない場合はNoneが返る
+        if not format_info or 'error' in format_info:
+            print(f"   エラー: {format_info['error'] if format_info else 'fmtチャンクが見つかりません'}")
         else:
             print(f"   オーディオフォーマット: {format_info['audio_format']}")
             print(f"   チャンネル数: {format_info['num_channels']}")
@@ -98,7 +99,7 @@ def main():
             
         format_info = investigate_wav_format(wav_file)
         
-        if 'error' in format_info:
+        if not format_info or 'error' in format_info:
             error_count += 1
         else:
             audio_format = format_info['audio_format']
@@ -3,10 +3,170 @@
 変換されたファイルを元のIEEE浮動小数点フォーマットに復元するスクリプト
 """
 
+import os
+import errno
 import shutil
+import argparse
+import threading
+import numpy as np
 from pathlib import Path
+from itertools import repeat
+from concurrent.futures import ThreadPoolExecutor
+from tqdm import tqdm
 
-def restore_from_backup(backup_dir, target_dir):
+from verify_metadata_wavs_consistency import count_metadata_ids, verify_ids
+
+# fcntlのインポートを試行（Windowsでは利用できないためreflinkを使わない）
+try:
+    import fcntl
+    FICLONE = getattr(fcntl, 'FICLONE', 0x40049409)  # Linuxのioctl(FICLONE)
+    FCNTL_AVAILABLE = True
+except ImportError:
+    FCNTL_AVAILABLE = False
+
+# 復元コピーの並列スレッド数（I/O待ちを重ねてSSDのキューを埋める）
+RESTORE_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+
+# スレッドプールに1回で渡すファイル数
+RESTORE_CHUNK_SIZE = 64
+
+# copy_file_rangeに1回で渡すバイト数（WAVファイルは通常1回で全体をコピーできる）
+COPY_CHUNK_SIZE = 1 << 28
+
+# ハードリンクできない場合に次の方法へ進むエラー（別ファイルシステム・リンク非対応のみ、それ以外は報告する）
+LINK_FALLBACK_ERRNOS = {errno.EXDEV, errno.EPERM, errno.ENOTSUP, errno.EOPNOTSUPP}
+
+# reflink非対応と判断するエラー（一度発生したら以降のファイルではreflinkを試さない）
+REFLINK_UNSUPPORTED_ERRNOS = {errno.EOPNOTSUPP, errno.ENOTSUP, errno.EXDEV, errno.EINVAL, errno.ENOTTY}
+
+# reflinkが使えるかどうか（最初の非対応エラーでFalseにする、convert_to_ljspeech.pyと共有）
+reflink_supported = FCNTL_AVAILABLE
+
+# 通常コピーで使う読み込みバッファのサイズ（スレッドごとに1つだけ確保して使い回す）
+COPY_BUFFER_SIZE = 1 << 20
+
+# posix_fadviseはPOSIX環境のみ（Windowsではページキャッシュへのヒントを省略する）
+FADVISE_AVAILABLE = hasattr(os, 'posix_fadvise')
+
+# スレッドごとのコピーバッファ（ファイルごとにバッファを確保しない）
+_thread_local = threading.local()
+
+def copy_via_temp(copy_func, src, dst):
+    """一時名のファイルへコピーしてからrenameで置き換え（dstの既存inodeは開かず、切り詰めない）"""
+    # dstがバックアップや元アーカイブへのハードリンクでも、renameで名前を差し替えるだけなのでリンク先は書き換わらない
+    temp_file = dst.with_name(f"{dst.name}.tmp")
+    try:
+        copy_func(src, temp_file)
+        os.replace(temp_file, dst)
+    finally:
+        # コピーに失敗した場合は作りかけの一時ファイルを削除
+        if os.path.lexists(temp_file):
+            os.unlink(temp_file)
+
+def reflink_file(src, dst):
+    """copy-on-write（Btrfs/XFSなど）でデータをコピーせずにファイルを複製"""
+    with open(src, 'rb') as src_f, open(dst, 'wb') as dst_f:
+        fcntl.ioctl(dst_f.fileno(), FICLONE, src_f.fileno())
+    shutil.copystat(src, dst)
+
+def try_reflink(src, dst):
+    """一時名にreflinkしてからdstへrename（成功ならTrue、失敗ならFalseで、非対応なら以降は試さない）"""
+    global reflink_supported
+    if not reflink_supported:
+        return False
+    try:
+        copy_via_temp(reflink_file, src, dst)
+        return True
+    except OSError as e:
+        # 非対応のファイルシステムでは、以降のファイルで一時ファイルの作成・ioctl・削除を繰り返さない
+        if e.errno in REFLINK_UNSUPPORTED_ERRNOS:
+            reflink_supported = False
+        return False
+
+def copy_file_range_file(src, dst):
+    """copy_file_rangeでデータをカーネル内でコピー（ユーザー空間のバッファを経由しない）"""
+    with open(src, 'rb') as src_f, open(dst, 'wb') as dst_f:
+        src_fd = src_f.fileno()
+        dst_fd = dst_f.fileno()
+        if FADVISE_AVAILABLE:
+            os.posix_fadvise(src_fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        while os.copy_file_range(src_fd, dst_fd, COPY_CHUNK_SIZE):
+            pass
+        # バックアップは一度しか読まないため、ページキャッシュから外して他のプロセスのキャッシュを残す
+        if FADVISE_AVAILABLE:
+            os.posix_fadvise(src_fd, 0, 0, os.POSIX_FADV_DONTNEED)
+            os.posix_fadvise(dst_fd, 0, 0, os.POSIX_FADV_DONTNEED)
+    shutil.copystat(src, dst)
+
+def get_copy_buffer():
+    """現在のスレッドのコピーバッファを取得（初回のみ確保）"""
+    buffer = getattr(_thread_local, 'copy_buffer', None)
+    if buffer is None:
+        buffer = _thread_local.copy_buffer = memoryview(bytearray(COPY_BUFFER_SIZE))
+    return buffer
+
+def buffered_copy_file(src, dst):
+    """スレッドごとの固定バッファへreadintoしながらコピー（copy_file_range非対応の環境向け）"""
+    buffer = get_copy_buffer()
+    with open(src, 'rb', buffering=0) as src_f, open(dst, 'wb') as dst_f:
+        while True:
+            n = src_f.readinto(buffer)
+            if not n:
+                break
+            dst_f.write(buffer[:n])
+    shutil.copystat(src, dst)
+
+def link_file(src, dst):
+    """ハードリンクで復元（データのコピーなし、既存のファイルは一時名のリンクをrenameして置き換え）"""
+    temp_link = dst.with_name(f"{dst.name}.link.tmp")
+    os.link(src, temp_link)
+    try:
+        os.replace(temp_link, dst)
+    finally:
+        # 失敗した場合や、既に同じinodeへのリンクでrenameが何もしなかった場合は一時名のリンクが残る
+        if os.path.lexists(temp_link):
+            os.unlink(temp_link)
+
+def restore_file(src, dst, use_link=False):
+    """バックアップを復元（ハードリンク（指定時のみ） → reflink → copy_file_range → バッファコピーの順に試行）"""
+    # 既にバックアップと同じファイルの場合はshutil.copy2と同様にエラーにする
+    if os.path.exists(dst) and os.path.samefile(src, dst):
+        raise shutil.SameFileError(f"{src!r} and {dst!r} are the same file")
+    
+    # ハードリンクはバックアップとinodeを共有するため、復元したファイルをその場で書き換えるとバックアップも変わる
+    # 別ファイルシステム（EXDEV）やリンク非対応の場合のみ次の方法へ
+    if use_link:
+        try:
+            link_file(src, dst)
+            return
+        except OSError as e:
+            if e.errno not in LINK_FALLBACK_ERRNOS:
+                raise
+    
+    # いずれのコピーも一時ファイルに書き込んでから置き換える（失敗しても既存のdstはそのまま残る）
+    if try_reflink(src, dst):
+        return
+    
+    # copy_file_rangeはLinux 4.5以降のみ（古いカーネルや異なるファイルシステム間ではエラーになる）
+    if hasattr(os, 'copy_file_range'):
+        try:
+            copy_via_temp(copy_file_range_file, src, dst)
+            return
+        except OSError:
+            pass
+    
+    copy_via_temp(buffered_copy_file, src, dst)
+
+def restore_one(backup_file, target_path, use_link=False):
+    """1ファイルをバックアップから復元（成功なら1、失敗なら0）"""
+    try:
+        restore_file(backup_file, target_path / backup_file.name, use_link)
+        return 1
+    except OSError as e:
+        print(f"復元エラー: {backup_file.name} - {e}")
+        return 0
+
+def restore_from_backup(backup_dir, target_dir, use_link=False):
     """バックアップから元のファイルを復元"""
     backup_path = Path(backup_dir)
     target_path = Path(target_dir)
@@ -15,38 +175,38 @@ def restore_from_backup(backup_dir, target_dir):
         print(f"バックアップディレクトリが見つかりません: {backup_dir}")
         return 0
     
-    restored_count = 0
-    backup_files = list(backup_path.glob('*.wav'))
+    # os.scandirで一覧を取得（DirEntryはそのままパスとして扱える）
+    with os.scandir(backup_path) as entries:
+        backup_files = [entry for entry in entries if entry.name.endswith('.wav')]
     
     print(f"復元対象: {len(backup_files)}ファイル")
     
-    for backup_file in backup_files:
-        target_file = target_path / backup_file.name
-        
-        # バックアップファイルを復元
-        shutil.copy2(backup_file, target_file)
-        restored_count += 1
+    # コピーはI/O待ちが中心のため、スレッドプールで並列に復元
+    with ThreadPoolExecutor(max_workers=RESTORE_WORKERS) as executor:
+        results = executor.map(restore_one, backup_files, repeat(target_path), repeat(use_link),
+                               chunksize=RESTORE_CHUNK_SIZE)
+        restored_count = sum(tqdm(results, total=len(backup_files), desc="復元中"))
     
     return restored_count
 
-def main():
+def main(verify=False, use_link=False):
     print("=== 元のIEEE浮動小数点フォーマットへの復元 ===\n")
     
     wavs_dir = Path('raw/wavs')
     
     # 中国語ファイルの復元
     print("=== 中国語ファイルの復元 ===")
-    zh_restored = restore_from_backup('backup_chinese_wavs', wavs_dir)
+    zh_restored = restore_from_backup('backup_chinese_wavs', wavs_dir, use_link)
     print(f"復元完了: {zh_restored}ファイル")
     
     # ロシア語ファイルの復元
     print("\n=== ロシア語ファイルの復元 ===")
-    ru_restored = restore_from_backup('backup_russian_wavs', wavs_dir)
+    ru_restored = restore_from_backup('backup_russian_wavs', wavs_dir, use_link)
     print(f"復元完了: {ru_restored}ファイル")
     
     # その他の言語ファイルの復元（進行中の変換がある場合）
     print("\n=== その他の言語ファイルの復元 ===")
-    all_ieee_restored = restore_from_backup('backup_all_ieee_wavs', wavs_dir)
+    all_ieee_restored = restore_from_backup('backup_all_ieee_wavs', wavs_dir, use_link)
     print(f"復元完了: {all_ieee_restored}ファイル")
     
     total_restored = zh_restored + ru_restored + all_ieee_restored
@@ -55,18 +215,34 @@ def main():
     
     # 復元後の確認
     print(f"\n=== 復元後の確認 ===")
-    wav_files = list(wavs_dir.glob('*.wav'))
-    print(f"WAVファイル総数: {len(wav_files)}ファイル")
+    with os.scandir(wavs_dir) as entries:
+        wav_names = [entry.name for entry in entries if entry.name.endswith('.wav')]
+    print(f"WAVファイル総数: {len(wav_names)}ファイル")
     
-    # 言語別ファイル数
-    lang_counts = {}
-    for wav_file in wav_files:
-        lang_code = wav_file.stem.split('_')[0]
-        lang_counts[lang_code] = lang_counts.get(lang_code, 0) + 1
+    # 言語別ファイル数（先頭2文字の言語コードの配列をnp.uniqueで一括集計、結果はコード順）
+    lang_codes, lang_counts = np.unique(np.array([wav_name[:2] for wav_name in wav_names], dtype=str),
+                                        return_counts=True)
     
     print(f"\n言語別ファイル数:")
-    for lang_code in sorted(lang_counts.keys()):
-        print(f"  {lang_code}: {lang_counts[lang_code]}ファイル")
+    for lang_code, count in zip(lang_codes.tolist(), lang_counts.tolist()):
+        print(f"  {lang_code}: {count}ファイル")
+    
+    # metadata.csvとの整合性確認（wavsフォルダを再走査せず、上で取得したファイル名を再利用）
+    if verify:
+        metadata_file = Path('raw/metadata.csv')
+        print(f"\n=== metadata.csvとの整合性確認 ===")
+        if not metadata_file.exists():
+            print(f"エラー: {metadata_file}が見つかりません")
+            return
+        
+        wav_ids = {os.fsencode(wav_name[:-4]) for wav_name in wav_names}
+        verify_ids(count_metadata_ids(metadata_file), wav_ids)
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--verify', action='store_true',
+                        help='復元後にmetadata.csvとwavsフォルダの整合性を確認する')
+    parser.add_argument('--link', action='store_true',
+                        help='同じファイルシステム上ではコピーせずハードリンクで復元する（復元したファイルをその場で編集しない場合のみ）')
+    args = parser.parse_args()
+    main(verify=args.verify, use_link=args.link) 
\ No newline at end of file
@@ -4,40 +4,55 @@
 """
 
 import os
+import re
 import shutil
+import argparse
+from itertools import islice
 from pathlib import Path
 from tqdm import tqdm
 
+# transcript.txtの行（ファイルパス|テキスト|...）の先頭2列を取り出す正規表現
+TRANSCRIPT_LINE_RE = re.compile(r'([^|]*)\|([^|]*)\|')
+
 def parse_transcript_line(line):
     """transcript.txtの1行をパースする"""
-    parts = line.strip().split('|')
-    if len(parts) >= 3:
-        file_path = parts[0]
-        text = parts[1]
-        return file_path, text
+    # 先頭2列だけをコンパイル済みの正規表現で取り出す（3列以上ある行のみ有効）
+    match = TRANSCRIPT_LINE_RE.match(line.strip())
+    if match:
+        return match.group(1, 2)
     return None, None
 
-def find_wav_file(base_path, file_path_from_transcript):
-    """WAVファイルの実際の場所を探す"""
+def index_archive(root):
+    """アーカイブ配下の全ファイルの相対パス集合を作成（ツリー全体を1回だけ走査）"""
+    files = set()
+    for dirpath, _, filenames in os.walk(root):
+        rel_dir = os.path.relpath(dirpath, root)
+        prefix = '' if rel_dir == '.' else rel_dir.replace(os.sep, '/') + '/'
+        files.update(prefix + name for name in filenames)
+    return files
+
+def find_wav_file(base_path, file_path_from_transcript, available):
+    """WAVファイルの実際の場所を探す（availableはindex_archiveの結果）"""
     possible_paths = [
-        base_path / file_path_from_transcript,
-        base_path / file_path_from_transcript.replace('/', '\\'),
+        file_path_from_transcript,
+        file_path_from_transcript.replace('/', '\\'),
     ]
     
     # 言語サブフォルダも確認
     lang_subfolder_paths = [
-        base_path / 'de' / file_path_from_transcript,
-        base_path / 'de' / file_path_from_transcript.replace('/', '\\'),
+        'de/' + file_path_from_transcript,
+        'de/' + file_path_from_transcript.replace('/', '\\'),
     ]
     possible_paths.extend(lang_subfolder_paths)
     
+    # 候補ごとにexists()を呼ばず、事前に作成したインデックスで存在を確認
     for path in possible_paths:
-        if path.exists():
-            return path
+        if path in available:
+            return base_path / path
     
     return None
 
-def test_archive_1():
+def test_archive_1(verbose=True):
     """archive (1)のテスト実行"""
     archive_path = Path('data/archive (1)')
     output_dir = Path('test_output')
@@ -48,45 +63,55 @@ def test_archive_1():
     
     transcript_file = archive_path / 'transcript.txt'
     
+    # アーカイブ内のファイル一覧を1回だけ作成
+    available = index_archive(archive_path)
+    
     print(f"テスト実行: archive (1)")
     print(f"transcript.txt: {transcript_file}")
     
-    # 最初の10行をテスト
+    # 最初の10行をテスト（ファイル全体は読み込まない）
     with open(transcript_file, 'r', encoding='utf-8') as f:
-        lines = f.readlines()[:10]
+        lines = list(islice(f, 10))
     
     metadata_rows = []
     processed_count = 0
     skipped_count = 0
     
-    for i, line in enumerate(lines):
-        print(f"\n行 {i+1}: {line.strip()}")
+    # 詳細表示しない場合は行ごとのprintを省略し、進捗はtqdmで表示
+    for i, line in enumerate(tqdm(lines, disable=verbose)):
+        if verbose:
+            print(f"\n行 {i+1}: {line.strip()}")
         
         file_path_from_transcript, text = parse_transcript_line(line)
         
         if not file_path_from_transcript or not text:
-            print("  -> パース失敗")
+            if verbose:
+                print("  -> パース失敗")
             continue
         
-        print(f"  ファイルパス: {file_path_from_transcript}")
-        print(f"  テキスト: {text[:50]}...")
+        if verbose:
+            print(f"  ファイルパス: {file_path_from_transcript}")
+            print(f"  テキスト: {text[:50]}...")
         
         # WAVファイルを探す
-        wav_file = find_wav_file(archive_path, file_path_from_transcript)
+        wav_file = find_wav_file(archive_path, file_path_from_transcript, available)
         
         if not wav_file:
-            print("  -> WAVファイルが見つかりません")
+            if verbose:
+                print("  -> WAVファイルが見つかりません")
             skipped_count += 1
             continue
         
-        print(f"  WAVファイル: {wav_file}")
+        if verbose:
+            print(f"  WAVファイル: {wav_file}")
         
         # 新しいファイル名を生成
         original_basename = Path(file_path_from_transcript).stem
         new_basename = f"de_{original_basename}"
         new_wav_path = output_wavs_dir / f"{new_basename}.wav"
         
-        print(f"  新しいファイル名: {new_basename}")
+        if verbose:
+            print(f"  新しいファイル名: {new_basename}")
         
         # WAVファイルをコピー
         try:
@@ -97,7 +122,8 @@ def test_archive_1():
             metadata_rows.append(metadata_row)
             
             processed_count += 1
-            print("  -> 成功")
+            if verbose:
+                print("  -> 成功")
             
         except Exception as e:
             print(f"  -> エラー: {e}")
@@ -115,4 +141,8 @@ def test_archive_1():
     print(f"出力ディレクトリ: {output_dir}")
 
 if __name__ == '__main__':
-    test_archive_1() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--quiet', action='store_true',
+                        help='行ごとの詳細を表示せず、進捗バーと結果のみを表示する')
+    args = parser.parse_args()
+    test_archive_1(verbose=not args.quiet) 
\ No newline at end of file
@@ -5,12 +5,20 @@ speaker=de → de の形式に変更
 """
 
 import os
+import re
 from pathlib import Path
 
+# メタデータ書き込み時のバッファサイズ（小さな書き込みをまとめる）
+METADATA_WRITE_BUFFER_SIZE = 1024 * 1024
+
+# メタデータの行（ファイル名|話者情報|テキスト|...）の先頭3列を取り出す正規表現（バイト列のまま照合する）
+METADATA_LINE_RE = re.compile(rb'([^|]*)\|([^|]*)\|([^|]*)')
+
 def update_metadata_format():
     """メタデータファイルの形式を更新する"""
     metadata_file = Path('raw/metadata.csv')
     backup_file = Path('raw/metadata_backup.csv')
+    temp_file = Path('raw/metadata.csv.tmp')
     
     if not metadata_file.exists():
         print("メタデータファイルが見つかりません: raw/metadata.csv")
@@ -18,38 +26,37 @@ def update_metadata_format():
     
     print("メタデータファイルの形式を更新中...")
     
-    # バックアップを作成
-    if backup_file.exists():
-        backup_file.unlink()
-    metadata_file.rename(backup_file)
-    
-    updated_rows = []
+    sample_rows = []
     updated_count = 0
     
-    # ファイルを読み込んで形式を更新
-    with open(backup_file, 'r', encoding='utf-8') as f:
+    # 元のファイルを読み込みながら形式を更新し、一時ファイルへ直接書き込み（全行をリストに保持しない）
+    # 途中で失敗しても元のmetadata.csvはそのまま残る
+    # 変換はASCIIの「speaker=」接頭辞だけなので、デコード・エンコードせずバイト列のまま処理する
+    with open(metadata_file, 'rb') as f, \
+            open(temp_file, 'wb', buffering=METADATA_WRITE_BUFFER_SIZE) as out:
         for line in f:
-            parts = line.strip().split('|')
-            if len(parts) >= 3:
-                filename = parts[0]
-                speaker_info = parts[1]
-                text = parts[2]
+            stripped = line.strip()
+            match = METADATA_LINE_RE.match(stripped)
+            if match:
+                filename, speaker_info, text = match.group(1, 2, 3)
                 
                 # speaker=de → de の形式に変更
-                if speaker_info.startswith('speaker='):
-                    lang_code = speaker_info.split('=')[1]
-                    new_line = f"{filename}|{lang_code}|{text}"
-                    updated_rows.append(new_line)
-                    updated_count += 1
+                if speaker_info.startswith(b'speaker='):
+                    lang_code = speaker_info.split(b'=')[1]
+                    new_line = b'|'.join((filename, lang_code, text))
                 else:
                     # 既に正しい形式の場合はそのまま
-                    updated_rows.append(line.strip())
-                    updated_count += 1
+                    new_line = stripped
+                
+                out.write(new_line)
+                out.write(b'\n')
+                updated_count += 1
+                if len(sample_rows) < 3:
+                    sample_rows.append(new_line)
     
-    # 新しいファイルを書き込み
-    with open(metadata_file, 'w', encoding='utf-8') as f:
-        for row in updated_rows:
-            f.write(row + '\n')
+    # 書き込みが完了してから、元のファイルをバックアップへ移動し一時ファイルで置き換え（いずれもrenameのみ）
+    os.replace(metadata_file, backup_file)
+    os.replace(temp_file, metadata_file)
     
     print(f"更新完了!")
     print(f"処理した行数: {updated_count}")
@@ -57,10 +64,10 @@ def update_metadata_format():
     print(f"更新されたファイル: {metadata_file}")
     
     # サンプルを表示
-    if updated_rows:
+    if sample_rows:
         print(f"\n更新後のサンプル:")
-        for i, row in enumerate(updated_rows[:3]):
-            print(f"  {i+1}: {row}")
+        for i, row in enumerate(sample_rows):
+            print(f"  {i+1}: {row.decode('utf-8', errors='replace')}")
 
 if __name__ == '__main__':
     update_metadata_format() 
\ No newline at end of file
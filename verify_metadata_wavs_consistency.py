@@ -3,9 +3,165 @@
 metadata.csvとwavsフォルダの整合性を確認するスクリプト
 """
 
+import io
 import os
+import sys
+import mmap
+import struct
+import numpy as np
 from pathlib import Path
 from collections import Counter
+from contextlib import redirect_stdout
+from concurrent.futures import ThreadPoolExecutor
+
+# ファイルごとのstat・ヘッダー読み込みの並列スレッド数（I/O待ちを重ねる）
+FILE_SCAN_WORKERS = 32
+
+# スレッドプールに1回で渡すファイル数
+FILE_SCAN_CHUNK_SIZE = 256
+
+# フォーマット確認で読み込むバイト数（標準的なWAVのRIFF・fmt・dataチャンクヘッダー）
+WAV_HEADER_SIZE = 44
+
+# 標準44バイトヘッダーの構造体（RIFFヘッダー、fmtチャンク、dataチャンクヘッダー）
+_WAV_HEADER = struct.Struct('<4sI4s4sIHHIIHH4sI')
+
+def read_at(fd, size, offset):
+    """fdのoffset位置からsizeバイトを読み込み（os.preadがないOSではlseek + read）"""
+    if hasattr(os, 'pread'):
+        return os.pread(fd, size, offset)
+    os.lseek(fd, offset, os.SEEK_SET)
+    return os.read(fd, size)
+
+def read_wav_header(wav_path):
+    """WAVファイル先頭の44バイトだけを読み込み、fmtチャンクの情報を取得（標準ヘッダーでなければNone）"""
+    try:
+        fd = os.open(wav_path, os.O_RDONLY | getattr(os, 'O_BINARY', 0))
+        try:
+            header = read_at(fd, WAV_HEADER_SIZE, 0)
+        finally:
+            os.close(fd)
+    except OSError:
+        return None
+    
+    if len(header) < _WAV_HEADER.size:
+        return None
+    
+    (riff, _, wave, fmt_id, _, audio_format, num_channels, sample_rate,
+     _, _, bits_per_sample, _, _) = _WAV_HEADER.unpack(header)
+    if riff != b'RIFF' or wave != b'WAVE' or fmt_id != b'fmt ':
+        return None
+    
+    return {
+        'audio_format': audio_format,
+        'num_channels': num_channels,
+        'sample_rate': sample_rate,
+        'bits_per_sample': bits_per_sample
+    }
+
+def get_file_size(entry):
+    """DirEntryのファイルサイズを取得"""
+    return entry.stat().st_size
+
+def count_metadata_ids(metadata_file):
+    """metadata.csvをメモリマップで走査し、IDごとの出現回数を取得（IDはデコードせずbytesのまま保持）"""
+    metadata_counter = Counter()
+    
+    # 空ファイルはmmapできないため先に確認
+    if os.path.getsize(metadata_file) == 0:
+        return metadata_counter
+    
+    with open(metadata_file, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        size = len(mm)
+        pos = 0
+        line_num = 0
+        while pos < size:
+            line_num += 1
+            end = mm.find(b'\n', pos)
+            if end == -1:
+                end = size
+            
+            # 最初の'|'までのIDだけを取り出す（列数の確認は'|'の位置だけで行う）
+            first_pipe = mm.find(b'|', pos, end)
+            if first_pipe != -1 and mm.find(b'|', first_pipe + 1, end) != -1:
+                file_id = mm[pos:first_pipe].lstrip()
+                metadata_counter[file_id] += 1
+            else:
+                line = mm[pos:end].strip()
+                if line:
+                    print(f"警告: 行{line_num}のフォーマットが不正: {line.decode('utf-8')}")
+            
+            pos = end + 1
+    
+    return metadata_counter
+
+def verify_ids(metadata_counter, wav_ids):
+    """metadataのIDごとの出現回数とWAVファイルのIDの集合（いずれもbytes）を照合してレポート"""
+    metadata_ids = metadata_counter.keys()
+    
+    # レポートは行数が多いため、メモリ上にまとめてから1回で書き出す
+    with redirect_stdout(io.StringIO()) as report:
+        # 整合性チェック
+        print("\n3. 整合性チェック...")
+        
+        # metadataにあり、wavsにないファイル
+        missing_wavs = metadata_ids - wav_ids
+        # wavsにあり、metadataにないファイル
+        missing_metadata = wav_ids - metadata_ids
+        # 共通部分は3つ目の大きな集合を作らず、件数だけを差集合から求める
+        common_count = len(metadata_ids) - len(missing_wavs)
+        
+        print(f"  共通ファイル数: {common_count}")
+        print(f"  metadataのみ（WAVファイル不足）: {len(missing_wavs)}")
+        print(f"  wavsのみ（メタデータ不足）: {len(missing_metadata)}")
+        
+        # 詳細レポート
+        if missing_wavs:
+            print(f"\n4. WAVファイルが不足しているID（最初の10個）:")
+            for i, missing_id in enumerate(sorted(missing_wavs)[:10]):
+                print(f"  {i+1}: {missing_id.decode('utf-8')}")
+            if len(missing_wavs) > 10:
+                print(f"  ... 他{len(missing_wavs) - 10}個")
+        
+        if missing_metadata:
+            print(f"\n5. メタデータが不足しているWAVファイル（最初の10個）:")
+            for i, missing_id in enumerate(sorted(missing_metadata)[:10]):
+                print(f"  {i+1}: {os.fsdecode(missing_id)}")
+            if len(missing_metadata) > 10:
+                print(f"  ... 他{len(missing_metadata) - 10}個")
+        
+        # 言語別の統計（言語コードの配列をnp.uniqueで一括集計、結果はコード順）
+        print(f"\n6. 言語別統計:")
+        common_lang_codes = [file_id.split(b'_', 1)[0] for file_id in wav_ids if file_id in metadata_counter]
+        lang_codes, lang_counts = np.unique(np.array(common_lang_codes, dtype=bytes), return_counts=True)
+        
+        for lang_code, count in zip(lang_codes.tolist(), lang_counts.tolist()):
+            print(f"  {lang_code.decode('utf-8')}: {count}ファイル")
+        
+        # 重複チェック
+        print(f"\n7. 重複チェック:")
+        duplicates = {k: v for k, v in metadata_counter.items() if v > 1}
+        if duplicates:
+            print(f"  メタデータ内の重複: {len(duplicates)}個")
+            for file_id, count in list(duplicates.items())[:5]:
+                print(f"    {file_id.decode('utf-8')}: {count}回")
+        else:
+            print(f"  メタデータ内の重複: なし")
+        
+        # 結果サマリー
+        print(f"\n=== 結果サマリー ===")
+        if len(missing_wavs) == 0 and len(missing_metadata) == 0:
+            print(f"✅ 完全一致: metadata.csvとwavsフォルダが過不足なく一致しています")
+        else:
+            print(f"❌ 不一致: 以下の問題があります")
+            if missing_wavs:
+                print(f"   - {len(missing_wavs)}個のWAVファイルが不足")
+            if missing_metadata:
+                print(f"   - {len(missing_metadata)}個のメタデータが不足")
+        
+        print(f"総ファイル数: {common_count}")
+        print(f"言語数: {len(lang_codes)}")
+    sys.stdout.write(report.getvalue())
 
 def verify_consistency():
     """metadata.csvとwavsフォルダの整合性を確認"""
@@ -27,141 +183,94 @@ def verify_consistency():
     
     # metadata.csvからIDを読み込み
     print("1. metadata.csvからIDを読み込み中...")
-    metadata_ids = set()
-    metadata_lines = []
-    
-    with open(metadata_file, 'r', encoding='utf-8') as f:
-        for line_num, line in enumerate(f, 1):
-            line = line.strip()
-            if not line:
-                continue
-            
-            parts = line.split('|')
-            if len(parts) >= 3:
-                file_id = parts[0]
-                metadata_ids.add(file_id)
-                metadata_lines.append((line_num, file_id, line))
-            else:
-                print(f"警告: 行{line_num}のフォーマットが不正: {line}")
+    # IDの集合は出現回数のCounterのキー（ビュー）をそのまま使い、重複チェックと共用する
+    metadata_counter = count_metadata_ids(metadata_file)
     
-    print(f"  読み込み完了: {len(metadata_ids)}個のID")
+    print(f"  読み込み完了: {len(metadata_counter)}個のID")
     
     # wavsフォルダからファイル名を読み込み
     print("\n2. wavsフォルダからファイル名を読み込み中...")
-    wav_files = list(wavs_dir.glob('*.wav'))
-    wav_ids = {f.stem for f in wav_files}
+    # bytesのパスで走査し、ファイル名もbytesのままmetadataのIDと比較（表示時のみデコード）
+    with os.scandir(os.fsencode(wavs_dir)) as entries:
+        wav_ids = {entry.name[:-4] for entry in entries if entry.name.endswith(b'.wav')}
     
     print(f"  読み込み完了: {len(wav_ids)}個のWAVファイル")
     
-    # 整合性チェック
-    print("\n3. 整合性チェック...")
-    
-    # metadataにあり、wavsにないファイル
-    missing_wavs = metadata_ids - wav_ids
-    # wavsにあり、metadataにないファイル
-    missing_metadata = wav_ids - metadata_ids
-    # 共通部分
-    common = metadata_ids & wav_ids
-    
-    print(f"  共通ファイル数: {len(common)}")
-    print(f"  metadataのみ（WAVファイル不足）: {len(missing_wavs)}")
-    print(f"  wavsのみ（メタデータ不足）: {len(missing_metadata)}")
-    
-    # 詳細レポート
-    if missing_wavs:
-        print(f"\n4. WAVファイルが不足しているID（最初の10個）:")
-        for i, missing_id in enumerate(sorted(missing_wavs)[:10]):
-            print(f"  {i+1}: {missing_id}")
-        if len(missing_wavs) > 10:
-            print(f"  ... 他{len(missing_wavs) - 10}個")
-    
-    if missing_metadata:
-        print(f"\n5. メタデータが不足しているWAVファイル（最初の10個）:")
-        for i, missing_id in enumerate(sorted(missing_metadata)[:10]):
-            print(f"  {i+1}: {missing_id}")
-        if len(missing_metadata) > 10:
-            print(f"  ... 他{len(missing_metadata) - 10}個")
-    
-    # 言語別の統計
-    print(f"\n6. 言語別統計:")
-    lang_stats = Counter()
-    for file_id in common:
-        lang_code = file_id.split('_')[0]
-        lang_stats[lang_code] += 1
-    
-    for lang_code, count in sorted(lang_stats.items()):
-        print(f"  {lang_code}: {count}ファイル")
-    
-    # 重複チェック
-    print(f"\n7. 重複チェック:")
-    metadata_counter = Counter()
-    for line_num, file_id, line in metadata_lines:
-        metadata_counter[file_id] += 1
-    
-    duplicates = {k: v for k, v in metadata_counter.items() if v > 1}
-    if duplicates:
-        print(f"  メタデータ内の重複: {len(duplicates)}個")
-        for file_id, count in list(duplicates.items())[:5]:
-            print(f"    {file_id}: {count}回")
-    else:
-        print(f"  メタデータ内の重複: なし")
-    
-    # 結果サマリー
-    print(f"\n=== 結果サマリー ===")
-    if len(missing_wavs) == 0 and len(missing_metadata) == 0:
-        print(f"✅ 完全一致: metadata.csvとwavsフォルダが過不足なく一致しています")
-    else:
-        print(f"❌ 不一致: 以下の問題があります")
-        if missing_wavs:
-            print(f"   - {len(missing_wavs)}個のWAVファイルが不足")
-        if missing_metadata:
-            print(f"   - {len(missing_metadata)}個のメタデータが不足")
-    
-    print(f"総ファイル数: {len(common)}")
-    print(f"言語数: {len(lang_stats)}")
+    verify_ids(metadata_counter, wav_ids)
 
 def check_file_sizes():
     """ファイルサイズの確認"""
     print(f"\n=== ファイルサイズ確認 ===")
     
     wavs_dir = Path('raw/wavs')
-    wav_files = list(wavs_dir.glob('*.wav'))
+    # 一覧の読み込みは1回の走査で行い、ファイルごとのstatはスレッドプールで並列に実行して配列にまとめる
+    with os.scandir(wavs_dir) as entries:
+        wav_entries = [entry for entry in entries if entry.name.endswith('.wav')]
+    with ThreadPoolExecutor(max_workers=FILE_SCAN_WORKERS) as executor:
+        wav_sizes = np.fromiter(executor.map(get_file_size, wav_entries, chunksize=FILE_SCAN_CHUNK_SIZE),
+                                dtype=np.int64, count=len(wav_entries))
     
-    if not wav_files:
+    if not len(wav_sizes):
         print("WAVファイルが見つかりません")
         return
     
-    total_size = sum(f.stat().st_size for f in wav_files)
-    avg_size = total_size / len(wav_files)
+    total_size = int(wav_sizes.sum())
+    avg_size = total_size / len(wav_sizes)
     
-    print(f"WAVファイル数: {len(wav_files)}")
+    print(f"WAVファイル数: {len(wav_sizes)}")
     print(f"総サイズ: {total_size / (1024**3):.2f} GB")
     print(f"平均ファイルサイズ: {avg_size / 1024:.1f} KB")
     
-    # サイズ分布
-    size_ranges = {
-        "0-100KB": 0,
-        "100KB-500KB": 0,
-        "500KB-1MB": 0,
-        "1MB以上": 0
-    }
-    
-    for wav_file in wav_files:
-        size = wav_file.stat().st_size
-        if size < 100 * 1024:
-            size_ranges["0-100KB"] += 1
-        elif size < 500 * 1024:
-            size_ranges["100KB-500KB"] += 1
-        elif size < 1024 * 1024:
-            size_ranges["500KB-1MB"] += 1
-        else:
-            size_ranges["1MB以上"] += 1
+    # サイズ分布（各ファイルの区間番号をsearchsortedで求め、bincountで一括集計）
+    size_range_names = ["0-100KB", "100KB-500KB", "500KB-1MB", "1MB以上"]
+    size_range_edges = np.array([100 * 1024, 500 * 1024, 1024 * 1024])
+    range_counts = np.bincount(np.searchsorted(size_range_edges, wav_sizes, side='right'),
+                               minlength=len(size_range_names))
+    size_ranges = dict(zip(size_range_names, range_counts.tolist()))
     
     print(f"\nファイルサイズ分布:")
     for range_name, count in size_ranges.items():
-        percentage = (count / len(wav_files)) * 100
+        percentage = (count / len(wav_sizes)) * 100
         print(f"  {range_name}: {count}ファイル ({percentage:.1f}%)")
 
+def verify_wav_formats():
+    """WAVフォーマットの確認（ヘッダーのみを読み込み）"""
+    print(f"\n=== WAVフォーマット確認 ===")
+    
+    wavs_dir = Path('raw/wavs')
+    with os.scandir(wavs_dir) as entries:
+        wav_paths = [entry.path for entry in entries if entry.name.endswith('.wav')]
+    
+    if not wav_paths:
+        print("WAVファイルが見つかりません")
+        return
+    
+    format_counts = Counter()
+    invalid_count = 0
+    # ヘッダー読み込みはI/O待ちが支配的なため、スレッドプールで並列に実行（結果は入力順）
+    with ThreadPoolExecutor(max_workers=FILE_SCAN_WORKERS) as executor:
+        header_infos = list(executor.map(read_wav_header, wav_paths, chunksize=FILE_SCAN_CHUNK_SIZE))
+    
+    for header_info in header_infos:
+        if header_info is None:
+            invalid_count += 1
+            continue
+        format_counts[(header_info['audio_format'], header_info['sample_rate'],
+                       header_info['num_channels'], header_info['bits_per_sample'])] += 1
+    
+    print(f"確認ファイル数: {len(wav_paths)}")
+    print(f"標準ヘッダー以外: {invalid_count}ファイル")
+    
+    print(f"\nフォーマット分布:")
+    for (audio_format, sample_rate, num_channels, bits_per_sample), count in sorted(format_counts.items()):
+        format_name = "PCM" if audio_format == 1 else "IEEE浮動小数点" if audio_format == 3 else f"その他({audio_format})"
+        print(f"  {format_name} {bits_per_sample}bit {sample_rate}Hz {num_channels}ch: {count}ファイル")
+    
+    sample_rates = sorted({sample_rate for _, sample_rate, _, _ in format_counts})
+    if len(sample_rates) > 1:
+        print(f"⚠️ サンプルレートが統一されていません: {sample_rates}")
+
 if __name__ == '__main__':
     verify_consistency()
-    check_file_sizes() 
\ No newline at end of file
+    check_file_sizes()
+    verify_wav_formats() 
\ No newline at end of file